@@ -1,91 +1,373 @@
+"""
+Contract Downloader
+
+Downloads the verified contracts of the Flare Explorer API. Contract sources are
+fetched concurrently over one pooled HTTP session, with a delay between requests
+that adapts to the API: it is doubled whenever the API throttles or fails, and
+slowly lowered again while requests succeed.
+
+Every contract is appended to a JSON Lines file as soon as it is downloaded and
+the file is synced to disk periodically, so an interrupted run loses at most
+the last few contracts. With `--incremental`, addresses already in the file
+are not downloaded again, which also resumes an interrupted run. Otherwise all
+contracts are downloaded into a temporary file next to the data file, which
+only replaces it once every page of the contract list and every contract was
+fetched, so a failed or throttled refresh keeps the previous data. The
+temporary file of an incomplete refresh is kept as a checkpoint, and the next
+refresh resumes it.
+"""
+
+import argparse
+import asyncio
 import json
+import os
 import time
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Self
 
-import requests
+import aiohttp
+import structlog
+
+from flare_ai_rag.utils.json_stream import READ_SIZE, iter_json_items, iter_json_lines
+
+logger = structlog.get_logger(__name__)
 
 # API Endpoints
 CONTRACT_LIST_URL = "https://flare-explorer.flare.network/api?module=contract&action=listcontracts&filter=verified&page={}"
 CONTRACT_SOURCE_URL = "https://flare-explorer.flare.network/api?module=contract&action=getsourcecode&address={}"
 
-# API Rate Limit
+# API Rate Limit, as the initial and the bounds of the delay between requests
 RATE_LIMIT = 0.1
+MIN_RATE_LIMIT = 0.02
+MAX_RATE_LIMIT = 30.0
+# Factor the delay is lowered by after every successful request
+RATE_LIMIT_DECAY = 0.95
 
-# Contracts Directory
-DATA_FILE = "../data/contracts.json"
+# Number of concurrent requests
+CONCURRENCY = 8
+MAX_RETRIES = 5
+REQUEST_TIMEOUT = 60
 
+# Number of contracts written between two syncs of the data file
+CHECKPOINT_INTERVAL = 100
 
-def fetch_verified_contracts():
-    """Fetches all verified contracts from Flare Explorer API across multiple pages."""
+HTTP_OK = 200
+HTTP_RATE_LIMIT = 429
+HTTP_SERVER_ERROR = 500
 
-    addresses = []
-    page = 0
+# Contracts Directory
+DATA_FILE = "../data/contracts.jsonl"
+
+
+class FetchError(Exception):
+    """A request failed, after retrying it if the failure was transient."""
+
+
+class AdaptiveRateLimiter:
+    """
+    Spaces out the start of requests by a delay that doubles when the API
+    throttles and shrinks slowly while it does not.
+
+    Requests that were already in flight or waiting for their slot when the
+    delay was raised fail for the same reason, so their failures do not raise
+    it again.
+    """
+
+    def __init__(
+        self,
+        delay: float = RATE_LIMIT,
+        min_delay: float = MIN_RATE_LIMIT,
+        max_delay: float = MAX_RATE_LIMIT,
+    ) -> None:
+        self.delay = delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self._next_request = 0.0
+        self._num_requests = 0
+        self._backoff = 0
+
+    async def wait(self) -> int:
+        """Wait for the next request slot, returning the number of the request."""
+        now = time.monotonic()
+        # Reserve the slot before sleeping, so concurrent requests queue up.
+        start = max(now, self._next_request)
+        self._next_request = start + self.delay
+        self._num_requests += 1
+        request = self._num_requests
+        if start > now:
+            await asyncio.sleep(start - now)
+        return request
+
+    def success(self) -> None:
+        self.delay = max(self.min_delay, self.delay * RATE_LIMIT_DECAY)
+
+    def throttled(self, request: int, retry_after: float | None = None) -> None:
+        """
+        Back off after the given request was throttled, pausing all requests for
+        at least `retry_after` seconds.
+        """
+        if request > self._backoff:
+            self.delay = min(self.max_delay, self.delay * 2)
+            self._backoff = self._num_requests
+        pause = max(self.delay, retry_after or 0.0)
+        self._next_request = max(self._next_request, time.monotonic() + pause)
+
+
+def _retry_after(response: aiohttp.ClientResponse) -> float | None:
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
 
-    while True:
-        response = requests.get(CONTRACT_LIST_URL.format(page))
 
-        if response.status_code != 200:
-            print(f"Failed to fetch page {page}, status code {response.status_code}")
-            break
+async def fetch_json(
+    session: aiohttp.ClientSession, limiter: AdaptiveRateLimiter, url: str
+) -> dict[str, Any] | None:
+    """
+    Fetch a JSON response, retrying when the API throttles, fails or times out.
+
+    Raises:
+        FetchError: If the request failed, or still failed after the retries.
+    """
+    for _ in range(MAX_RETRIES):
+        request = await limiter.wait()
+        try:
+            async with session.get(url) as response:
+                if response.status == HTTP_OK:
+                    limiter.success()
+                    return await response.json(content_type=None)
+                if (
+                    response.status != HTTP_RATE_LIMIT
+                    and response.status < HTTP_SERVER_ERROR
+                ):
+                    logger.warning(
+                        "Failed to fetch.", url=url, status_code=response.status
+                    )
+                    msg = f"Failed to fetch {url}: HTTP {response.status}."
+                    raise FetchError(msg)
+                limiter.throttled(request, _retry_after(response))
+        except (aiohttp.ClientError, TimeoutError, json.JSONDecodeError):
+            limiter.throttled(request)
+    logger.warning("Failed to fetch, giving up.", url=url, attempts=MAX_RETRIES)
+    msg = f"Failed to fetch {url} after {MAX_RETRIES} attempts."
+    raise FetchError(msg)
+
+
+async def fetch_verified_contracts(
+    session: aiohttp.ClientSession, limiter: AdaptiveRateLimiter
+) -> tuple[list[str], bool]:
+    """
+    Fetches all verified contracts from Flare Explorer API across multiple pages.
+
+    Returns:
+        tuple[list[str], bool]: The contract addresses, and whether every page
+            was fetched, as opposed to the listing stopping at a failed page.
+    """
+
+    addresses: dict[str, None] = {}
+    page = 0
 
-        data = response.json()
+    while True:
+        try:
+            data = await fetch_json(session, limiter, CONTRACT_LIST_URL.format(page))
+        except FetchError:
+            logger.warning("Contract list is incomplete.", failed_page=page)
+            return list(addresses), False
 
-        if data.get("status") != "1" or not data.get("result"):
+        if not data or data.get("status") != "1" or not data.get("result"):
             break
 
-        addresses.extend(contract["Address"] for contract in data["result"])
-        print(f"Fetched {len(data['result'])} contracts from page {page}")
+        addresses.update(dict.fromkeys(c["Address"] for c in data["result"]))
+        logger.info(
+            "Fetched contract list page.", page=page, num_contracts=len(data["result"])
+        )
 
         page += 1
-        time.sleep(RATE_LIMIT)
-
-    return addresses
 
+    return list(addresses), True
 
-def fetch_contract_data(address):
-    """Fetches source code and metadata for a given contract address."""
 
-    response = requests.get(CONTRACT_SOURCE_URL.format(address))
+async def fetch_contract_data(
+    session: aiohttp.ClientSession, limiter: AdaptiveRateLimiter, address: str
+) -> dict[str, Any] | None:
+    """
+    Fetches source code and metadata for a given contract address, None if the
+    API has no source for it.
 
-    if response.status_code != 200:
-        print(
-            f"Failed to fetch source for {address}, status code {response.status_code}"
-        )
-        return None
+    Raises:
+        FetchError: If the request failed.
+    """
 
-    data = response.json()
+    data = await fetch_json(session, limiter, CONTRACT_SOURCE_URL.format(address))
 
-    if data.get("status") != "1" or not data.get("result"):
+    if not data or data.get("status") != "1" or not data.get("result"):
         return None
 
-    return data["result"][0]
-
-
-def main():
-    """Main execution function."""
-
-    print("Fetching contract list...")
-    addresses = fetch_verified_contracts()
-
-    if not addresses:
-        print("No contracts found")
-        return
-
-    print(f"Found {len(addresses)} contracts")
-
-    contracts = {}
+    contract = data["result"][0]
+    contract.setdefault("Address", address)
+    return contract
+
+
+class CheckpointWriter:
+    """Appends contracts to a JSON Lines file, syncing it every few contracts."""
+
+    def __init__(self, path: Path, interval: int = CHECKPOINT_INTERVAL) -> None:
+        self.path = path
+        self.interval = interval
+        self.count = 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = path.open("a", encoding="utf-8")
+
+    def write(self, contract: dict[str, Any]) -> None:
+        self._file.write(json.dumps(contract) + "\n")
+        self.count += 1
+        if self.count % self.interval == 0:
+            self.checkpoint()
+
+    def checkpoint(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        self.checkpoint()
+        self._file.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+
+def load_downloaded(path: Path) -> set[str]:
+    """
+    Return the addresses of the contracts in a data file.
+
+    A partly written last line, left by an interrupted run, is cut off so that
+    new contracts are appended on a line of their own.
+    """
+    if not path.exists():
+        return set()
+    with path.open("rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        while end > 0:
+            start = max(0, end - READ_SIZE)
+            f.seek(start)
+            line_break = f.read(end - start).rfind(b"\n")
+            if line_break != -1:
+                end = start + line_break + 1
+                break
+            end = start
+        f.truncate(end)
+    return {item["Address"] for item in iter_json_lines(path) if "Address" in item}
+
+
+def migrate_legacy(legacy: Path, path: Path) -> None:
+    """Convert contracts downloaded into a JSON array file to JSON Lines."""
+    logger.info("Converting the legacy data file.", legacy=str(legacy), path=str(path))
+    with CheckpointWriter(path) as writer:
+        for item in iter_json_items(legacy):
+            writer.write(item)
+
+
+async def download(
+    path: Path, concurrency: int = CONCURRENCY, *, incremental: bool = False
+) -> int:
+    """
+    Download the verified contracts into a JSON Lines file.
+
+    Args:
+        path: The data file.
+        concurrency: Maximum number of requests in flight.
+        incremental: Only download contracts missing from the data file,
+            instead of downloading all of them into a new one, which replaces
+            the data file once the download is complete.
+
+    Returns:
+        int: The number of contracts downloaded.
+    """
+    if incremental:
+        output = path
+    else:
+        # The previous data is kept until the new download is complete, and
+        # an incomplete one is resumed.
+        output = path.with_name(path.name + ".tmp")
+        if output.exists():
+            logger.info("Resuming the incomplete download.", path=str(output))
+    downloaded = load_downloaded(output)
+
+    limiter = AdaptiveRateLimiter()
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        logger.info("Fetching contract list...")
+        addresses, listed = await fetch_verified_contracts(session, limiter)
+        if not addresses:
+            logger.warning("No contracts found, keeping the data file.")
+            return 0
+        missing = [address for address in addresses if address not in downloaded]
+        logger.info(
+            "Fetched contract list.",
+            num_contracts=len(addresses),
+            num_missing=len(missing),
+        )
 
-    for address in addresses:
-        print(f"Fetching source for contract at {address}...")
-        data = fetch_contract_data(address)
-        if data:
-            contracts[data["FileName"]] = data
+        failed: list[str] = []
+        with CheckpointWriter(output) as writer:
+            # Workers share one iterator, so every address is fetched once.
+            pending = iter(missing)
+
+            async def worker() -> None:
+                for address in pending:
+                    try:
+                        data = await fetch_contract_data(session, limiter, address)
+                    except FetchError:
+                        failed.append(address)
+                        continue
+                    if data:
+                        writer.write(data)
+
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    logger.info("Downloaded contracts.", num_contracts=writer.count, path=str(output))
+    if not listed or failed:
+        # Another run downloads the missing contracts.
+        logger.warning(
+            "Download is incomplete, run it again to resume it.",
+            contract_list_complete=listed,
+            num_failed=len(failed),
+            checkpoint=str(output),
+        )
+    elif output != path:
+        output.replace(path)
+    return writer.count
 
-        time.sleep(RATE_LIMIT)
 
-    print(f"Downloaded {len(contracts)} contracts")
+def main() -> None:
+    """Main execution function."""
 
-    with open(DATA_FILE, "w", encoding="utf-8") as file:
-        json.dump(list(contracts.values()), file, indent=4)
+    parser = argparse.ArgumentParser(description="Download the verified contracts.")
+    parser.add_argument("--output", type=Path, default=Path(DATA_FILE))
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only download contracts that are not in the output file yet",
+    )
+    args = parser.parse_args()
+
+    # Contracts downloaded before the data file was in the JSON Lines format
+    legacy = args.output.with_suffix(".json")
+    if args.incremental and not args.output.exists() and legacy.exists():
+        migrate_legacy(legacy, args.output)
+
+    asyncio.run(download(args.output, args.concurrency, incremental=args.incremental))
 
 
 if __name__ == "__main__":
@@ -1,15 +1,23 @@
 from .base import AsyncBaseClient, BaseClient, BaseAIProvider
+from .embedding_cache import EmbeddingCache
+from .embedding_executor import EmbeddingExecutor
 from .gemini import EmbeddingTaskType, GeminiEmbedding, GeminiProvider
 from .model import Model
 from .openrouter import OpenRouterClient
+from .rate_limiter import RateLimiter, TokenBucket, retry_with_backoff
 
 __all__ = [
     "AsyncBaseClient",
     "BaseClient",
     "BaseAIProvider",
+    "EmbeddingCache",
+    "EmbeddingExecutor",
     "EmbeddingTaskType",
     "GeminiEmbedding",
     "GeminiProvider",
     "Model",
     "OpenRouterClient",
+    "RateLimiter",
+    "TokenBucket",
+    "retry_with_backoff",
 ]
@@ -0,0 +1,161 @@
+"""
+Embedding Cache Module
+
+This module implements a persistent, size-bounded embedding cache backed by
+SQLite. Embeddings are deterministic for a given model, task type, title and
+text, so they are stored under a hash of those values and reused across
+restarts, re-deploys and re-chunking runs.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+# Fraction of max_entries kept after an eviction pass, so that eviction does not
+# run again on every insert once the cache is full.
+EVICTION_TARGET = 0.9
+# SQLite limits the number of bound parameters per statement.
+LOOKUP_CHUNK_SIZE = 500
+# Number of looked up embeddings whose recency is written without waiting for
+# the next insert.
+RECENCY_FLUSH_SIZE = 10_000
+
+
+class EmbeddingCache:
+    """
+    Persistent embedding cache with least-recently-used eviction.
+
+    Vectors are stored as float32, which is the precision Qdrant keeps anyway.
+    Lookups only note when an embedding was last used; the recency is written
+    in one transaction with the next insert, so lookups never commit. The
+    cache is safe to share between threads.
+    """
+
+    def __init__(self, path: Path, max_entries: int = 250_000) -> None:
+        """
+        Args:
+            path: Location of the SQLite database file.
+            max_entries: Number of embeddings kept before the least recently
+                used ones are evicted.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # When each looked up embedding was used, not written yet.
+        self._last_used: dict[bytes, float] = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key BLOB PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings(last_used)"
+        )
+        self._conn.commit()
+        self._size = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def key(model: str, task_type: object, title: str | None, text: str) -> bytes:
+        """Hash everything an embedding depends on into a cache key."""
+        task = getattr(task_type, "name", str(task_type))
+        digest = hashlib.sha256()
+        for part in (model, task, title or "", text):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\x1f")
+        return digest.digest()
+
+    def get_many(self, keys: Sequence[bytes]) -> dict[bytes, list[float]]:
+        """Look up embeddings, returning only the keys that are cached."""
+        found: dict[bytes, list[float]] = {}
+        unique_keys = list(dict.fromkeys(keys))
+        with self._lock:
+            for start in range(0, len(unique_keys), LOOKUP_CHUNK_SIZE):
+                chunk = unique_keys[start : start + LOOKUP_CHUNK_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",  # noqa: S608
+                    chunk,
+                ).fetchall()
+                for key, vector in rows:
+                    found[key] = array("f", vector).tolist()
+            self._last_used.update(dict.fromkeys(found, time.time()))
+            if len(self._last_used) >= RECENCY_FLUSH_SIZE:
+                self._write_last_used()
+                self._conn.commit()
+            self.hits += sum(1 for key in keys if key in found)
+            self.misses += sum(1 for key in keys if key not in found)
+        return found
+
+    def get(self, key: bytes) -> list[float] | None:
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items: Iterable[tuple[bytes, Sequence[float]]]) -> None:
+        """Store embeddings, evicting the least recently used ones if needed."""
+        now = time.time()
+        rows = [(key, array("f", vector).tobytes(), now) for key, vector in items]
+        if not rows:
+            return
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_used) "
+                "VALUES (?, ?, ?)",
+                rows,
+            )
+            self._size += self._conn.total_changes - before
+            # Evict by the recency of the latest lookups too.
+            self._write_last_used()
+            if self._size > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def put(self, key: bytes, vector: Sequence[float]) -> None:
+        self.put_many([(key, vector)])
+
+    def _write_last_used(self) -> None:
+        if not self._last_used:
+            return
+        self._conn.executemany(
+            "UPDATE embeddings SET last_used = ? WHERE key = ?",
+            [(last_used, key) for key, last_used in self._last_used.items()],
+        )
+        self._last_used.clear()
+
+    def _evict(self) -> None:
+        excess = self._size - int(self.max_entries * EVICTION_TARGET)
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN "
+            "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+            (excess,),
+        )
+        self._size -= excess
+        logger.info("Evicted embeddings from cache.", num_evicted=excess)
+
+    def stats(self) -> dict[str, int | float]:
+        """Hit/miss counters and the current number of cached embeddings."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "size": self._size,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._write_last_used()
+            self._conn.commit()
+            self._conn.close()
@@ -0,0 +1,40 @@
+"""
+Embedding Executor Module
+
+This module runs embedding jobs on a pool of worker threads. Jobs are submitted
+lazily with a bounded number in flight, and results are delivered in the order
+the jobs were submitted, so callers can stream batches through it.
+"""
+
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+
+from flare_ai_rag.utils.pipeline import ordered_map
+
+
+class EmbeddingExecutor:
+    """Concurrent executor for embedding jobs with ordered result delivery."""
+
+    def __init__(self, workers: int = 4, max_pending: int | None = None) -> None:
+        """
+        Args:
+            workers: Number of worker threads sending embedding requests.
+            max_pending: Maximum number of submitted jobs whose results have
+                not been consumed yet, defaults to twice the worker count.
+        """
+        if workers < 1:
+            msg = "workers must be at least 1"
+            raise ValueError(msg)
+        self.workers = workers
+        self.max_pending = max_pending or 2 * workers
+
+    def map[T, R](self, func: Callable[[T], R], jobs: Iterable[T]) -> Iterator[R]:
+        """Apply `func` to every job concurrently, yielding results in order."""
+        if self.workers == 1:
+            yield from map(func, jobs)
+            return
+
+        with ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="embedding"
+        ) as pool:
+            yield from ordered_map(pool, func, jobs, self.max_pending)
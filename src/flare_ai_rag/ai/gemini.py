@@ -6,10 +6,14 @@ with Google's Generative AI service. It handles chat sessions, content generatio
 and message management while maintaining a consistent AI personality.
 """
 
+import threading
+from collections.abc import Callable, Iterator, Sequence
 from typing import Any, override
 
 import structlog
-from google.generativeai.client import configure
+from google.api_core.exceptions import InvalidArgument
+from google.generativeai import protos
+from google.generativeai.client import configure, get_default_generative_client
 from google.generativeai.embedding import (
     EmbeddingTaskType,
 )
@@ -18,11 +22,27 @@ from google.generativeai.embedding import (
 )
 from google.generativeai.generative_models import GenerativeModel
 from google.generativeai.types import GenerationConfig
+from google.generativeai.types.model_types import make_model_name
 
 from flare_ai_rag.ai.base import BaseAIProvider, ModelResponse
+from flare_ai_rag.ai.embedding_cache import EmbeddingCache
+from flare_ai_rag.ai.rate_limiter import RateLimiter, retry_with_backoff
 
 logger = structlog.get_logger(__name__)
 
+# Maximum number of requests accepted by a single batchEmbedContents call.
+EMBEDDING_MAX_BATCH_SIZE = 100
+# Initial payload budget per embedding request, lowered whenever the API rejects
+# a request as too large.
+EMBEDDING_MAX_PAYLOAD_BYTES = 1_000_000
+# Successful requests after which lowered payload limits are raised again, by
+# EMBEDDING_LIMIT_GROWTH, up to their initial values.
+EMBEDDING_LIMIT_RECOVERY_REQUESTS = 50
+EMBEDDING_LIMIT_GROWTH = 1.5
+PAYLOAD_LIMIT_ERROR = "Request payload size exceeds the limit"
+# Rough number of UTF-8 bytes per token, used to charge the tokens-per-minute quota.
+BYTES_PER_TOKEN = 4
+
 
 SYSTEM_INSTRUCTION = """
 You are an AI assistant specialized in helping users navigate
@@ -193,16 +213,47 @@ class GeminiProvider(BaseAIProvider):
         )
 
 
+def _payload_size(text: str, title: str | None) -> int:
+    """Approximate number of bytes a single embedding request adds to a payload."""
+    return len(text.encode("utf-8")) + len((title or "").encode("utf-8"))
+
+
+def _truncate_utf8(text: str, max_bytes: int) -> str:
+    """Cut text down to at most max_bytes of UTF-8 without splitting a character."""
+    return text.encode("utf-8")[:max_bytes].decode("utf-8", errors="ignore")
+
+
 class GeminiEmbedding:
-    def __init__(self, api_key: str) -> None:
+    def __init__(
+        self,
+        api_key: str,
+        rate_limiter: RateLimiter | None = None,
+        max_retries: int = 5,
+        cache: EmbeddingCache | None = None,
+    ) -> None:
         """
         Initialize Gemini with API credentials.
         This client uses google.generativeai
 
         Args:
             api_key (str): Google API key for authentication
+            rate_limiter (RateLimiter | None): Limiter shared by every thread using
+                this client to stay within the embedding quota
+            max_retries (int): Retries for throttled (429) and server (5xx) errors
+            cache (EmbeddingCache | None): Persistent cache consulted before
+                any embedding request is sent
         """
         configure(api_key=api_key)
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.cache = cache
+        # Payload limits learned from rejected requests, shared by every thread
+        # using this client and guarded by the lock.
+        self.max_payload_bytes = EMBEDDING_MAX_PAYLOAD_BYTES
+        self.max_item_bytes: int | None = None
+        self._limits_lock = threading.Lock()
+        self._successful_requests = 0
+        self.logger = logger.bind(service="gemini_embedding")
 
     def embed_content(
         self,
@@ -221,12 +272,273 @@ class GeminiEmbedding:
         Returns:
             list[float]: The generated embedding vector.
         """
-        response = _embed_content(
-            model=embedding_model, content=contents, task_type=task_type, title=title
+        key = None
+        if self.cache is not None:
+            key = self.cache.key(embedding_model, task_type, title, contents)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        response = self._call(
+            lambda: _embed_content(
+                model=embedding_model,
+                content=contents,
+                task_type=task_type,
+                title=title,
+            ),
+            _payload_size(contents, title),
         )
         try:
             embedding = response["embedding"]
         except (KeyError, IndexError) as e:
             msg = "Failed to extract embedding from response."
             raise ValueError(msg) from e
+        if self.cache is not None and key is not None:
+            self.cache.put(key, embedding)
         return embedding
+
+    def embed_batch(
+        self,
+        embedding_model: str,
+        contents: Sequence[str],
+        task_type: EmbeddingTaskType,
+        titles: Sequence[str | None] | None = None,
+    ) -> list[list[float]]:
+        """
+        Generate embeddings for many texts, packing them into as few requests
+        as the API payload limit allows.
+
+        Requests rejected for their size are split in half and retried. A single
+        text that is still too large on its own is embedded from a truncated
+        prefix instead of being dropped.
+
+        Args:
+            embedding_model (str): The embedding model to use.
+            contents (Sequence[str]): The texts to be embedded.
+            task_type (EmbeddingTaskType): The embedding task type.
+            titles (Sequence[str | None] | None): Optional title for every text,
+                only used for RETRIEVAL_DOCUMENT embeddings.
+
+        Returns:
+            list[list[float]]: One embedding vector per text, in input order.
+        """
+        if titles is None:
+            titles = [None] * len(contents)
+        if len(titles) != len(contents):
+            msg = "The number of titles must match the number of contents."
+            raise ValueError(msg)
+        if task_type != EmbeddingTaskType.RETRIEVAL_DOCUMENT:
+            titles = [None] * len(contents)
+
+        items = list(zip(contents, titles, strict=True))
+        if self.cache is None:
+            return self._embed_items(embedding_model, task_type, items)
+
+        keys = [
+            self.cache.key(embedding_model, task_type, title, text)
+            for text, title in items
+        ]
+        cached = self.cache.get_many(keys)
+        missing = list(
+            {
+                key: item
+                for key, item in zip(keys, items, strict=True)
+                if key not in cached
+            }.items()
+        )
+        if missing:
+            embedded = self._embed_items(
+                embedding_model, task_type, [item for _, item in missing]
+            )
+            new_entries = [
+                (key, embedding)
+                for (key, _), embedding in zip(missing, embedded, strict=True)
+            ]
+            self.cache.put_many(new_entries)
+            cached.update(new_entries)
+        return [cached[key] for key in keys]
+
+    def _embed_items(
+        self,
+        embedding_model: str,
+        task_type: EmbeddingTaskType,
+        items: list[tuple[str, str | None]],
+    ) -> list[list[float]]:
+        """Embed (text, title) pairs through as few packed requests as possible."""
+        max_payload_bytes, max_item_bytes = self._limits()
+        if max_item_bytes is not None:
+            items = [
+                self._fit_item(text, title, max_item_bytes) for text, title in items
+            ]
+
+        embeddings: list[list[float]] = []
+        for batch in self._pack(items, max_payload_bytes):
+            embeddings.extend(self._embed_packed(embedding_model, task_type, batch))
+        return embeddings
+
+    def _limits(self) -> tuple[int, int | None]:
+        """The current payload limits of a request and of a single item in it."""
+        with self._limits_lock:
+            return self.max_payload_bytes, self.max_item_bytes
+
+    def _lower_limits(
+        self, payload_bytes: int | None = None, item_bytes: int | None = None
+    ) -> tuple[int, int | None]:
+        """Lower the payload limits after a rejected request, returning them."""
+        with self._limits_lock:
+            if payload_bytes is not None:
+                self.max_payload_bytes = min(self.max_payload_bytes, payload_bytes)
+            if item_bytes is not None:
+                self.max_item_bytes = min(self.max_item_bytes or item_bytes, item_bytes)
+            self._successful_requests = 0
+            return self.max_payload_bytes, self.max_item_bytes
+
+    def _recover_limits(self) -> None:
+        """
+        Count a successful request, and raise lowered payload limits again
+        after EMBEDDING_LIMIT_RECOVERY_REQUESTS of them, so a rejection does
+        not shrink every later request for the lifetime of the client.
+        """
+        with self._limits_lock:
+            if (
+                self.max_payload_bytes >= EMBEDDING_MAX_PAYLOAD_BYTES
+                and self.max_item_bytes is None
+            ):
+                return
+            self._successful_requests += 1
+            if self._successful_requests < EMBEDDING_LIMIT_RECOVERY_REQUESTS:
+                return
+            self._successful_requests = 0
+            self.max_payload_bytes = min(
+                int(self.max_payload_bytes * EMBEDDING_LIMIT_GROWTH),
+                EMBEDDING_MAX_PAYLOAD_BYTES,
+            )
+            if self.max_item_bytes is not None:
+                max_item_bytes = int(self.max_item_bytes * EMBEDDING_LIMIT_GROWTH)
+                self.max_item_bytes = (
+                    max_item_bytes
+                    if max_item_bytes < EMBEDDING_MAX_PAYLOAD_BYTES
+                    else None
+                )
+            self.logger.debug(
+                "Raising embedding payload limits.",
+                max_payload_bytes=self.max_payload_bytes,
+                max_item_bytes=self.max_item_bytes,
+            )
+
+    @staticmethod
+    def _fit_item(
+        text: str, title: str | None, max_item_bytes: int
+    ) -> tuple[str, str | None]:
+        """Truncate a text that is known to exceed the per-request size limit."""
+        if _payload_size(text, title) <= max_item_bytes:
+            return text, title
+        title_bytes = len((title or "").encode("utf-8"))
+        return _truncate_utf8(text, max(max_item_bytes - title_bytes, 1)), title
+
+    @staticmethod
+    def _pack(
+        items: list[tuple[str, str | None]], max_payload_bytes: int
+    ) -> Iterator[list[tuple[str, str | None]]]:
+        """Greedily group items into batches within the count and payload limits."""
+        batch: list[tuple[str, str | None]] = []
+        batch_bytes = 0
+        for text, title in items:
+            size = _payload_size(text, title)
+            if batch and (
+                len(batch) >= EMBEDDING_MAX_BATCH_SIZE
+                or batch_bytes + size > max_payload_bytes
+            ):
+                yield batch
+                batch, batch_bytes = [], 0
+            batch.append((text, title))
+            batch_bytes += size
+        if batch:
+            yield batch
+
+    def _embed_packed(
+        self,
+        embedding_model: str,
+        task_type: EmbeddingTaskType,
+        batch: list[tuple[str, str | None]],
+    ) -> list[list[float]]:
+        """Embed one packed batch, splitting it if the payload is rejected."""
+        try:
+            return self._batch_embed_contents(embedding_model, task_type, batch)
+        except InvalidArgument as e:
+            if PAYLOAD_LIMIT_ERROR not in str(e):
+                raise
+
+        size = sum(_payload_size(text, title) for text, title in batch)
+        if len(batch) == 1:
+            text, title = batch[0]
+            if len(text) <= 1:
+                msg = "Embedding request is too large even after truncation."
+                raise ValueError(msg)
+            _, max_item_bytes = self._lower_limits(item_bytes=size // 2)
+            self.logger.warning(
+                "Truncating oversized document for embedding.",
+                title=title,
+                size=size,
+                max_item_bytes=max_item_bytes,
+            )
+            return self._embed_packed(
+                embedding_model,
+                task_type,
+                [self._fit_item(text, title, max_item_bytes or size // 2)],
+            )
+
+        max_payload_bytes, _ = self._lower_limits(payload_bytes=size // 2)
+        self.logger.debug(
+            "Splitting embedding batch due to payload size.",
+            batch_size=len(batch),
+            size=size,
+            max_payload_bytes=max_payload_bytes,
+        )
+        middle = len(batch) // 2
+        return self._embed_packed(
+            embedding_model, task_type, batch[:middle]
+        ) + self._embed_packed(embedding_model, task_type, batch[middle:])
+
+    def _batch_embed_contents(
+        self,
+        embedding_model: str,
+        task_type: EmbeddingTaskType,
+        batch: list[tuple[str, str | None]],
+    ) -> list[list[float]]:
+        """Send a single batchEmbedContents request."""
+        model = make_model_name(embedding_model)
+        request = protos.BatchEmbedContentsRequest(
+            model=model,
+            requests=[
+                protos.EmbedContentRequest(
+                    model=model,
+                    content=protos.Content(parts=[protos.Part(text=text)]),
+                    task_type=task_type,
+                    title=title,
+                )
+                for text, title in batch
+            ],
+        )
+        response = self._call(
+            lambda: get_default_generative_client().batch_embed_contents(request),
+            sum(_payload_size(text, title) for text, title in batch),
+        )
+        embeddings = [list(embedding.values) for embedding in response.embeddings]
+        if len(embeddings) != len(batch):
+            msg = "Failed to extract embeddings from batch response."
+            raise ValueError(msg)
+        self._recover_limits()
+        return embeddings
+
+    def _call[T](self, request: Callable[[], T], payload_bytes: int) -> T:
+        """Send a request through the rate limiter, retrying transient errors."""
+
+        def send() -> T:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(tokens=payload_bytes // BYTES_PER_TOKEN)
+            return request()
+
+        return retry_with_backoff(
+            send, max_retries=self.max_retries, rate_limiter=self.rate_limiter
+        )
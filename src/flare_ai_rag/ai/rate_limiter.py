@@ -0,0 +1,134 @@
+"""
+Rate Limiting Module
+
+This module provides a thread-safe token-bucket rate limiter used to keep
+embedding traffic within the Gemini requests-per-minute and tokens-per-minute
+quotas, plus a retry helper with jittered exponential backoff for throttled
+(429) and failed (5xx) requests.
+"""
+
+import random
+import threading
+import time
+from collections.abc import Callable
+
+import structlog
+from google.api_core.exceptions import ServerError, TooManyRequests
+
+logger = structlog.get_logger(__name__)
+
+RETRYABLE_ERRORS = (TooManyRequests, ServerError)
+
+
+class TokenBucket:
+    """A token bucket refilled continuously at a fixed rate per minute."""
+
+    def __init__(self, rate_per_minute: float, capacity: float | None = None) -> None:
+        """
+        Args:
+            rate_per_minute: Number of tokens added to the bucket every minute.
+            capacity: Maximum number of tokens the bucket can hold, defaults
+                to one minute worth of tokens.
+        """
+        if rate_per_minute <= 0:
+            msg = "rate_per_minute must be positive"
+            raise ValueError(msg)
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated_at) * self.rate
+        )
+        self.updated_at = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` tokens are available (0 if available now)."""
+        self._refill(now)
+        # Requests larger than the bucket are let through once it is full.
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float) -> None:
+        self.tokens -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """
+    Thread-safe limiter on requests per minute and tokens per minute.
+
+    A single instance is meant to be shared by every thread talking to the same
+    API quota.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float,
+        tokens_per_minute: float | None = None,
+    ) -> None:
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = (
+            TokenBucket(tokens_per_minute) if tokens_per_minute is not None else None
+        )
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int = 0) -> None:
+        """Block until one request carrying `tokens` tokens may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = max(
+                    self.blocked_until - now,
+                    self.requests.wait_time(1, now),
+                    self.tokens.wait_time(tokens, now) if self.tokens else 0.0,
+                )
+                if wait <= 0:
+                    self.requests.consume(1)
+                    if self.tokens:
+                        self.tokens.consume(tokens)
+                    return
+            time.sleep(wait)
+
+    def backoff(self, seconds: float) -> None:
+        """Pause all callers for `seconds`, e.g. after the API reported a 429."""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+def retry_with_backoff[T](
+    func: Callable[[], T],
+    max_retries: int = 5,
+    base_delay: float = 1.0,
+    max_delay: float = 60.0,
+    rate_limiter: RateLimiter | None = None,
+) -> T:
+    """
+    Call `func`, retrying throttled and server errors with jittered backoff.
+
+    Throttling errors also pause the shared rate limiter so that concurrent
+    callers back off together instead of hammering the quota.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return func()
+        except RETRYABLE_ERRORS as e:
+            if attempt == max_retries:
+                raise
+            # Full jitter: sleep a random amount up to the exponential bound.
+            delay = random.uniform(0, min(max_delay, base_delay * 2**attempt))  # noqa: S311
+            if rate_limiter is not None and isinstance(e, TooManyRequests):
+                rate_limiter.backoff(delay)
+            logger.warning(
+                "Retrying request.",
+                error=type(e).__name__,
+                attempt=attempt + 1,
+                delay=round(delay, 2),
+            )
+            time.sleep(delay)
+    msg = "unreachable"
+    raise AssertionError(msg)
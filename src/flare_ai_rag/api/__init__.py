@@ -1,4 +1,5 @@
 from .routes.base import BaseRouter
 from .routes.chat import ChatMessage, ChatRouter, router
+from .routes.health import HealthRouter
 
-__all__ = ["ChatMessage", "ChatRouter", "router"]
+__all__ = ["ChatMessage", "ChatRouter", "HealthRouter", "router"]
@@ -0,0 +1,48 @@
+import asyncio
+from typing import Any
+
+from fastapi import APIRouter, Response, status
+
+from flare_ai_rag.indexer import Indexer
+
+
+class HealthRouter:
+    """
+    Reports whether the server can answer queries, and the state of the index.
+    """
+
+    def __init__(self, router: APIRouter, indexer: Indexer) -> None:
+        """
+        Initialize the HealthRouter.
+
+        Args:
+            router (APIRouter): FastAPI router to attach endpoints.
+            indexer (Indexer): Indexer building the collections queries are
+                answered from.
+        """
+        self._router = router
+        self.indexer = indexer
+        self._setup_routes()
+
+    def _setup_routes(self) -> None:
+        """
+        Set up FastAPI routes for the readiness endpoint.
+        """
+
+        @self._router.get("/ready")
+        async def ready(response: Response) -> dict[str, Any]:
+            """
+            Report the state and progress of the index builds. Responds with
+            503 until every collection can be searched, which is right away
+            when the collections of a previous build exist.
+            """
+            # Counting the points queries Qdrant, keep it off the event loop.
+            report = await asyncio.to_thread(self.indexer.report)
+            if not report["servable"]:
+                response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+            return report
+
+    @property
+    def router(self) -> APIRouter:
+        """Return the underlying FastAPI router with registered endpoints."""
+        return self._router
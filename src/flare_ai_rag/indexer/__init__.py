@@ -0,0 +1,13 @@
+from .manifest import IndexManifest
+from .scheduler import SourceScheduler
+from .service import Indexer
+from .snapshots import SnapshotStore
+from .watcher import SourceWatcher
+
+__all__ = [
+    "IndexManifest",
+    "Indexer",
+    "SnapshotStore",
+    "SourceScheduler",
+    "SourceWatcher",
+]
@@ -0,0 +1,107 @@
+"""
+Index Build Command Module
+
+This module builds the index as a standalone job, without starting the
+backend: it pulls the document sources, then parses, chunks, embeds and
+upserts the whole corpus into the Qdrant collections, like the initial sync
+of the backend. Live progress with the throughput of every stage is logged
+while it runs, and a timing breakdown once it is done:
+
+    uv run flare-rag-index
+    uv run flare-rag-index --skip-sources --workers 4
+"""
+
+import argparse
+import threading
+import time
+
+import structlog
+from qdrant_client import QdrantClient
+
+from flare_ai_rag.indexer.setup import setup_indexer
+from flare_ai_rag.retriever import RetrieverConfig
+from flare_ai_rag.settings import settings
+from flare_ai_rag.utils import load_json
+from flare_ai_rag.utils.progress import REPORT_INTERVAL, PipelineMetrics, peak_rss_mb
+from flare_ai_rag.utils.source_manager import update_sources
+
+logger = structlog.get_logger(__name__)
+
+
+def _report_progress(
+    metrics: PipelineMetrics, stopped: threading.Event, interval: float
+) -> None:
+    start = time.monotonic()
+    while not stopped.wait(interval):
+        logger.info(
+            "Index build progress.",
+            elapsed_s=round(time.monotonic() - start, 1),
+            stages=metrics.stages(),
+            peak_rss_mb=round(peak_rss_mb(), 1),
+        )
+
+
+def main() -> None:
+    """Build the index once and exit."""
+    parser = argparse.ArgumentParser(
+        prog="flare-rag-index", description="Build the Qdrant index of the corpus."
+    )
+    parser.add_argument(
+        "--skip-sources",
+        action="store_true",
+        help="index the checked out sources without pulling them first",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="processes parsing source files, defaults to the ingestion_workers "
+        "setting",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=REPORT_INTERVAL,
+        help="seconds between two progress reports",
+    )
+    args = parser.parse_args()
+
+    input_config = load_json(settings.input_path / "input_parameters.json")
+    retriever_config = RetrieverConfig.load(input_config["retriever_config"])
+    qdrant_client = QdrantClient(host=retriever_config.host, port=retriever_config.port)
+    metrics = PipelineMetrics()
+    indexer = setup_indexer(
+        qdrant_client, input_config, workers=args.workers or None, metrics=metrics
+    )
+
+    stopped = threading.Event()
+    reporter = threading.Thread(
+        target=_report_progress,
+        args=(metrics, stopped, args.interval),
+        daemon=True,
+        name="IndexProgressThread",
+    )
+    reporter.start()
+    start = time.monotonic()
+    try:
+        if not args.skip_sources:
+            with metrics.phase("sources"):
+                changed = update_sources()
+            logger.info("Sources updated.", num_changed_files=len(changed))
+        indexer.sync()
+    finally:
+        stopped.set()
+        reporter.join()
+
+    logger.info(
+        "Index build done.",
+        seconds=round(time.monotonic() - start, 2),
+        phases=metrics.phases(),
+        stages=metrics.stages(),
+        chunks=indexer.status.chunks,
+        peak_rss_mb=round(peak_rss_mb(), 1),
+    )
+
+
+if __name__ == "__main__":
+    main()
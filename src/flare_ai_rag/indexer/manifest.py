@@ -0,0 +1,200 @@
+"""
+Index Manifest Module
+
+This module records what every Qdrant collection was built from: the commit
+each source is checked out at and its local changes, the chunking
+configuration, the embedding model and vector size, and, for the code
+collection, a hash of the contracts file.
+A sync skips a collection whose manifest matches the current inputs, so a
+restart with an unchanged corpus does not parse the corpus again, and a change
+only reworks the collections it affects.
+"""
+
+import hashlib
+import json
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any
+
+import git
+import structlog
+from qdrant_client import QdrantClient
+
+from flare_ai_rag.retriever import RetrieverConfig, live_collection
+from flare_ai_rag.utils.json_stream import READ_SIZE, resolve_data_file
+from flare_ai_rag.utils.source_manager import read_settings
+from flare_ai_rag.utils.splitter import ChunkingConfig
+
+logger = structlog.get_logger(__name__)
+
+# Bump when a change of the parsing or chunking code changes the chunks of an
+# unchanged corpus.
+FINGERPRINT_VERSION = 4
+
+
+def _file_digest(path: Path) -> str | None:
+    if not path.exists():
+        return None
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        while data := f.read(READ_SIZE):
+            digest.update(data)
+    return digest.hexdigest()
+
+
+def _files_digest(files: list[Path]) -> str:
+    """Digest of the path, size and modification time of files, or of their path."""
+    digest = hashlib.sha256()
+    for file in sorted(files):
+        if file.is_file():
+            stat = file.stat()
+            digest.update(f"{file}\x1f{stat.st_size}\x1f{stat.st_mtime_ns}\n".encode())
+        elif not file.exists():
+            # A file deleted locally.
+            digest.update(f"{file}\n".encode())
+    return digest.hexdigest()
+
+
+def _source_state(source_path: Path) -> str | None:
+    """
+    The commit a source is checked out at, and the files changed locally in a
+    dirty checkout. Sources that are not git checkouts are identified by the
+    path, size and modification time of their files.
+    """
+    try:
+        repo = git.Repo(source_path)
+        commit = repo.head.commit.hexsha
+    except git.NoSuchPathError:
+        return None
+    except (git.InvalidGitRepositoryError, ValueError):
+        return _files_digest(list(source_path.rglob("*")))
+    if not repo.is_dirty(untracked_files=True):
+        return commit
+    changed = repo.git.status("--porcelain", "--untracked-files=all", "-z")
+    paths = [entry[3:] for entry in changed.split("\0") if entry[3:]]
+    return f"{commit}+{_files_digest([source_path / path for path in paths])}"
+
+
+def index_inputs(
+    data_path: Path, retriever_config: RetrieverConfig, chunking: ChunkingConfig
+) -> dict[str, Any]:
+    """
+    Everything the collections are built from: the checked out state and
+    settings of every source, the contracts file, and the chunking and
+    retriever configuration.
+    """
+    return {
+        "version": FINGERPRINT_VERSION,
+        "sources": [
+            {**source, "state": _source_state(data_path / "files" / source["name"])}
+            for source in read_settings()
+        ],
+        "contracts": _file_digest(resolve_data_file(data_path / "contracts.json")),
+        "chunking": asdict(chunking),
+        "retriever": {
+            "embedding_model": retriever_config.embedding_model,
+            "collection_name": retriever_config.collection_name,
+            "vector_size": retriever_config.vector_size,
+            "dedup_threshold": retriever_config.dedup_threshold,
+        },
+    }
+
+
+def collection_inputs(inputs: dict[str, Any], collection_type: str) -> dict[str, Any]:
+    """The part of the index inputs a collection is built from."""
+    if collection_type == "code":
+        return inputs
+    # Only the code collection holds the verified contracts.
+    return {key: value for key, value in inputs.items() if key != "contracts"}
+
+
+def corpus_inputs(inputs: dict[str, Any], *, with_state: bool = True) -> dict[str, Any]:
+    """
+    The part of the index inputs the corpus store is parsed from, optionally
+    without the checked out state of the sources.
+    """
+    sources = inputs["sources"]
+    if not with_state:
+        sources = [
+            {key: value for key, value in source.items() if key != "state"}
+            for source in sources
+        ]
+    return {
+        "version": inputs["version"],
+        "sources": sources,
+        "chunking": inputs["chunking"],
+    }
+
+
+def inputs_fingerprint(inputs: dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+
+class IndexManifest:
+    """Directory of `<collection type>.json` manifests of the collections."""
+
+    def __init__(
+        self,
+        path: Path,
+        qdrant_client: QdrantClient,
+        retriever_config: RetrieverConfig,
+    ) -> None:
+        """
+        Args:
+            path: Directory holding the manifests, created if needed.
+            qdrant_client: Client of the Qdrant instance holding the collections.
+            retriever_config: Configuration of the collections.
+        """
+        self.path = path
+        self.qdrant_client = qdrant_client
+        self.retriever_config = retriever_config
+
+    def read(self, collection_type: str) -> dict[str, Any] | None:
+        manifest = self.path / f"{collection_type}.json"
+        if not manifest.exists():
+            return None
+        return json.loads(manifest.read_text())
+
+    def matches(self, collection_type: str, inputs: dict[str, Any]) -> bool:
+        """
+        Whether the collection serving the given type was built from these
+        inputs. A manifest only describes the versioned collection it was
+        written for, so it does not match once the collection is replaced or
+        Qdrant lost it.
+        """
+        manifest = self.read(collection_type)
+        return (
+            manifest is not None
+            and manifest["fingerprint"] == inputs_fingerprint(inputs)
+            and manifest["collection"]
+            == live_collection(
+                self.qdrant_client, self.retriever_config, collection_type
+            )
+        )
+
+    def invalidate(self, collection_type: str) -> None:
+        """Remove the manifest of a collection that is about to change."""
+        (self.path / f"{collection_type}.json").unlink(missing_ok=True)
+
+    def write(self, collection_type: str, inputs: dict[str, Any]) -> None:
+        """Record the inputs the live collection of the given type was built from."""
+        collection = live_collection(
+            self.qdrant_client, self.retriever_config, collection_type
+        )
+        if collection is None:
+            return
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp = self.path / f"{collection_type}.json.tmp"
+        tmp.write_text(
+            json.dumps(
+                {
+                    "collection": collection,
+                    "fingerprint": inputs_fingerprint(inputs),
+                    "created_at": time.time(),
+                    "inputs": inputs,
+                },
+                indent=2,
+            )
+        )
+        tmp.replace(self.path / f"{collection_type}.json")
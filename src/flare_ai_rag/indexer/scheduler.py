@@ -0,0 +1,104 @@
+"""
+Source Scheduler Module
+
+This module builds the index and polls the document sources in a background
+thread, handing the files that changed upstream to the indexer. The server
+starts serving right away, from the collections of the last build, and picks
+up documentation changes without a rebuild or a restart.
+"""
+
+import threading
+from typing import TYPE_CHECKING
+
+import structlog
+
+from flare_ai_rag.indexer.service import Indexer
+from flare_ai_rag.utils.source_manager import update_sources
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+logger = structlog.get_logger(__name__)
+
+
+class SourceScheduler:
+    """
+    Syncs the index with the sources once, then periodically pulls the sources
+    and updates the changed files.
+    """
+
+    def __init__(
+        self, indexer: Indexer, interval: float, *, sync_on_start: bool = True
+    ) -> None:
+        """
+        Args:
+            indexer: Indexer receiving the changed files.
+            interval: Number of seconds between two polls, 0 disables polling.
+            sync_on_start: Pull the sources and run a full sync when started.
+        """
+        self.indexer = indexer
+        self.interval = interval
+        self.sync_on_start = sync_on_start
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+        # Pulled changes are not reported again, so keep them until indexed.
+        self._pending: set[Path] = set()
+
+    def start(self) -> None:
+        """Start the initial sync and polling in a daemon thread."""
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, daemon=True, name="SourceSchedulerThread"
+        )
+        self._thread.start()
+        logger.info("Source scheduler started.", interval=self.interval)
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Stop polling, waiting up to `timeout` seconds for a running update."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def bootstrap(self) -> None:
+        """
+        Restore the index from snapshots, if Qdrant has none and the snapshots
+        match the checked out sources, then pull the sources and sync the whole
+        index with them.
+        """
+        self.indexer.restore()
+        # Every file is synced, so the changed files are not needed.
+        update_sources()
+        self.indexer.sync()
+
+    def poll(self) -> None:
+        """
+        Pull the sources once, update the files that changed, and export the
+        collections changed by this or earlier updates to the snapshots.
+        """
+        self._pending.update(update_sources())
+        if self._pending:
+            self.indexer.update(self._pending)
+            self._pending.clear()
+        else:
+            logger.debug("Sources are up to date.")
+        # Also covers the updates of the source watcher since the last poll.
+        self.indexer.export_snapshots()
+
+    def _run(self) -> None:
+        if self.sync_on_start:
+            try:
+                self.bootstrap()
+            except Exception:
+                # The collections of the last build keep being served.
+                logger.exception("Error building the index.")
+        if self.interval <= 0:
+            return
+        while not self._stopped.wait(self.interval):
+            try:
+                self.poll()
+            except Exception:
+                # Keep polling, the next attempt may succeed.
+                logger.exception("Error updating the sources.")
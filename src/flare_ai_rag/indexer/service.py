@@ -0,0 +1,460 @@
+"""
+Indexer Service Module
+
+This module keeps the Qdrant collections in sync with the document sources.
+The sources are parsed into the corpus store, from which the chunks are
+streamed through the collections. A full sync parses the whole corpus, unless
+the store was parsed from the same inputs, while an update only re-parses the
+files that changed upstream and replaces their chunks.
+The indexer tracks the state and progress of these runs, so the server can
+report whether, and from what, it is able to serve while an index is built.
+"""
+
+import threading
+import time
+from collections.abc import Callable, Collection, Generator, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Literal
+
+import httpx
+import structlog
+from qdrant_client import QdrantClient
+from qdrant_client.http.exceptions import ResponseHandlingException, UnexpectedResponse
+
+from flare_ai_rag.ai import GeminiEmbedding
+from flare_ai_rag.indexer.manifest import (
+    IndexManifest,
+    collection_inputs,
+    corpus_inputs,
+    index_inputs,
+    inputs_fingerprint,
+)
+from flare_ai_rag.indexer.snapshots import SnapshotStore
+from flare_ai_rag.retriever import (
+    IncompatibleCollectionError,
+    RetrieverConfig,
+    generate_collection,
+)
+from flare_ai_rag.utils.code_data_reader import CodeIngestionBudget, iter_code_data
+from flare_ai_rag.utils.corpus_store import CorpusStore
+from flare_ai_rag.utils.data_maker import file_names, make_data
+from flare_ai_rag.utils.progress import PipelineMetrics
+from flare_ai_rag.utils.records import ChunkRecord, CollectionType
+from flare_ai_rag.utils.splitter import ChunkingConfig
+
+logger = structlog.get_logger(__name__)
+
+COLLECTION_TYPES: tuple[CollectionType, ...] = ("answer", "code")
+
+IndexState = Literal["idle", "indexing", "ready", "failed"]
+
+
+@dataclass
+class IndexStatus:
+    """
+    State of the index builds.
+
+    Attributes:
+        state: "idle" before the first build, "indexing" while a build runs,
+            then "ready" or "failed" depending on how the last build ended.
+        started_at: Unix time the last build started at.
+        finished_at: Unix time the last successful build finished at.
+        error: Error of the last build, if it failed.
+        chunks: Number of chunks streamed into each collection by the running
+            or last build.
+    """
+
+    state: IndexState = "idle"
+    started_at: float | None = None
+    finished_at: float | None = None
+    error: str | None = None
+    chunks: dict[str, int] = field(default_factory=dict)
+
+
+class Indexer:
+    """Builds and updates the answer and code collections."""
+
+    def __init__(  # noqa: PLR0913
+        self,
+        qdrant_client: QdrantClient,
+        retriever_config: RetrieverConfig,
+        embedding_client: GeminiEmbedding,
+        data_path: Path,
+        workers: int | None = None,
+        chunking: ChunkingConfig | None = None,
+        code_budget: CodeIngestionBudget | None = None,
+        snapshots: SnapshotStore | None = None,
+        manifest: IndexManifest | None = None,
+        metrics: PipelineMetrics | None = None,
+    ) -> None:
+        """
+        Args:
+            qdrant_client: Client of the Qdrant instance holding the collections.
+            retriever_config: Configuration of the collections and embeddings.
+            embedding_client: Client used to embed new chunks.
+            data_path: Directory holding the source checkouts and contracts.
+            workers: Number of processes parsing source files, all cores by
+                default.
+            chunking: How documents are split into chunks, character chunks
+                by default.
+            code_budget: Memory and time budget of the contract ingestion.
+            snapshots: Where the collections are exported to after they
+                changed, and restored from into an empty Qdrant instance.
+            manifest: Where the inputs every collection was built from are
+                recorded, so a sync skips the collections whose inputs did not
+                change.
+            metrics: Counters of the files, chunks, embeddings and upserts of
+                each collection, and durations of the sync and snapshot phases.
+        """
+        self.qdrant_client = qdrant_client
+        self.retriever_config = retriever_config
+        self.embedding_client = embedding_client
+        self.data_path = data_path
+        self.workers = workers
+        self.chunking = chunking
+        self.code_budget = code_budget
+        self.snapshots = snapshots
+        self.manifest = manifest
+        self.metrics = metrics
+        self.status = IndexStatus()
+        # Syncs and updates of the same collections must not interleave.
+        self._lock = threading.Lock()
+        # Whether updates changed the collections since they were exported.
+        self._snapshots_stale = False
+        # Whether a build left a collection incomplete since the last complete
+        # sync. Such collections are not exported.
+        self._incomplete = False
+
+    def _stored_corpus_inputs(self) -> dict[str, Any] | None:
+        try:
+            with CorpusStore(self.data_path / "corpus") as store:
+                return store.inputs
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def parse_corpus(
+        self, inputs: dict[str, Any], changed_files: Collection[Path] | None = None
+    ) -> None:
+        """
+        Parse the source files into the corpus store, unless it was parsed from
+        the same inputs. With `changed_files`, only these files are parsed
+        again, if the rest of the store was parsed with the same settings.
+        """
+        corpus = corpus_inputs(inputs)
+        stored = self._stored_corpus_inputs()
+        if changed_files is None and stored == corpus:
+            logger.info("Corpus store is up to date, skipping parsing.")
+            return
+        if stored is None or corpus_inputs(stored, with_state=False) != (
+            corpus_inputs(corpus, with_state=False)
+        ):
+            changed_files = None
+        with self._phase("parse"):
+            make_data(
+                self.data_path,
+                self.workers,
+                changed_files=changed_files,
+                chunking=self.chunking,
+                inputs=corpus,
+            )
+
+    def load_corpus(
+        self,
+        collection_type: CollectionType,
+        files: Collection[str] | None = None,
+    ) -> Iterator[ChunkRecord]:
+        """
+        Stream the chunks of the given collection from the corpus store, which
+        has to be written by parse_corpus first, and the contracts for the
+        code collection. With `files`, only the chunks of these file names are
+        streamed from the store, and no contracts.
+        """
+        with CorpusStore(self.data_path / "corpus") as store:
+            yield from store.select(collection_type, files)
+        if collection_type == "code" and files is None:
+            yield from iter_code_data(
+                self.data_path / "contracts.json",
+                chunking=self.chunking,
+                workers=self.workers,
+                budget=self.code_budget,
+            )
+
+    def collection_sizes(self) -> dict[str, int | None]:
+        """
+        Number of points served by each collection, None if it does not exist
+        or Qdrant cannot be reached.
+        """
+        sizes: dict[str, int | None] = {}
+        for collection_type in COLLECTION_TYPES:
+            name = self.retriever_config.collection_name + collection_type
+            try:
+                sizes[collection_type] = self.qdrant_client.count(
+                    name, exact=False
+                ).count
+            except (
+                UnexpectedResponse,
+                ResponseHandlingException,
+                httpx.TransportError,
+                ValueError,
+            ):
+                sizes[collection_type] = None
+        return sizes
+
+    def report(self) -> dict[str, Any]:
+        """
+        Report the state of the index.
+
+        The index is servable as soon as every collection exists, which includes
+        the collections of a previous build while a new one runs. A collection
+        is only published once it has been filled.
+        """
+        collections = self.collection_sizes()
+        return {
+            "servable": all(size is not None for size in collections.values()),
+            "collections": collections,
+            **asdict(self.status),
+        }
+
+    def inputs(self) -> dict[str, Any]:
+        """The corpus and configuration the index is built from."""
+        return index_inputs(
+            self.data_path, self.retriever_config, self.chunking or ChunkingConfig()
+        )
+
+    def fingerprint(self) -> str:
+        """Fingerprint of the corpus and configuration the index is built from."""
+        return inputs_fingerprint(self.inputs())
+
+    def restore(self) -> bool:
+        """
+        Restore the collections from the snapshots, if none of them exist yet
+        and the snapshots were built from the current corpus. Only complete
+        collections are exported, so the restored ones are recorded in the
+        manifest.
+
+        Returns:
+            bool: Whether the collections were restored.
+        """
+        if self.snapshots is None or any(
+            size is not None for size in self.collection_sizes().values()
+        ):
+            return False
+        with self._lock:
+            inputs = self.inputs()
+            if not self.snapshots.restore(inputs_fingerprint(inputs), COLLECTION_TYPES):
+                return False
+            if self.manifest is not None:
+                for collection_type in COLLECTION_TYPES:
+                    self.manifest.write(
+                        collection_type, collection_inputs(inputs, collection_type)
+                    )
+            return True
+
+    def export_snapshots(self) -> None:
+        """
+        Export the collections to the snapshots, if updates changed them since
+        the last export. Updates do not export the collections themselves, so
+        that a burst of them does not export after each one; this is called
+        once per source poll instead.
+        """
+        if not self._snapshots_stale:
+            return
+        with self._lock:
+            self._export_snapshots(self.fingerprint())
+
+    def _export_snapshots(self, fingerprint: str) -> None:
+        if self._incomplete:
+            # Restoring them would record the missing chunks as embedded.
+            logger.warning("Index is incomplete, not exporting the snapshots.")
+            return
+        if self.snapshots is None or self.snapshots.fingerprint() == fingerprint:
+            self._snapshots_stale = False
+            return
+        try:
+            with self._phase("snapshot export"):
+                self.snapshots.export(fingerprint, COLLECTION_TYPES)
+            self._snapshots_stale = False
+        except Exception:
+            # The index itself is fine, only the next cold start is slower.
+            logger.exception("Error exporting the index snapshots.")
+
+    @contextmanager
+    def _indexing(self) -> Generator[None]:
+        self.status.state = "indexing"
+        self.status.started_at = time.time()
+        self.status.error = None
+        self.status.chunks = dict.fromkeys(COLLECTION_TYPES, 0)
+        try:
+            yield
+        except Exception as e:
+            self.status.state = "failed"
+            self.status.error = repr(e)
+            raise
+        self.status.state = "ready"
+        self.status.finished_at = time.time()
+
+    def _phase(self, name: str) -> AbstractContextManager[None]:
+        return self.metrics.phase(name) if self.metrics else nullcontext()
+
+    def _counted(
+        self, records: Iterable[ChunkRecord], collection_type: CollectionType
+    ) -> Iterator[ChunkRecord]:
+        file_name = None
+        for record in records:
+            self.status.chunks[collection_type] += 1
+            if self.metrics is not None:
+                # Records arrive grouped by file.
+                if record["file_name"] != file_name:
+                    file_name = record["file_name"]
+                    self.metrics.add(f"{collection_type}.files", 1)
+                self.metrics.add(f"{collection_type}.chunks", 1)
+            yield record
+
+    def _is_current(
+        self, collection_type: CollectionType, inputs: dict[str, Any]
+    ) -> bool:
+        """Whether the collection was built from the same inputs."""
+        if self.manifest is None or not self.manifest.matches(
+            collection_type, collection_inputs(inputs, collection_type)
+        ):
+            return False
+        logger.info(
+            "Collection is up to date with its manifest, skipping it.",
+            collection_type=collection_type,
+        )
+        return True
+
+    def _build(
+        self,
+        collection_type: CollectionType,
+        inputs: dict[str, Any],
+        build: Callable[[], bool],
+    ) -> bool:
+        """
+        Run the build of a collection, and record the inputs it was built from
+        if it is complete.
+
+        Returns:
+            bool: Whether the build is complete.
+        """
+        if self.manifest is None:
+            return build()
+        inputs = collection_inputs(inputs, collection_type)
+        # A build that fails halfway leaves a collection matching no inputs.
+        self.manifest.invalidate(collection_type)
+        if not build():
+            # Without a manifest, the next sync embeds the missing chunks.
+            logger.warning(
+                "Collection build is incomplete, not recording its inputs.",
+                collection_type=collection_type,
+            )
+            return False
+        self.manifest.write(collection_type, inputs)
+        return True
+
+    def sync(self) -> None:
+        """
+        Sync both collections with the whole corpus, in parallel, and export
+        them to the snapshots if the corpus changed and every build is
+        complete. Collections whose manifest matches the current corpus and
+        configuration are skipped.
+        """
+        with self._lock:
+            inputs = self.inputs()
+            with self._indexing(), self._phase("sync"):
+                self._incomplete = not self._sync(inputs)
+            self._export_snapshots(inputs_fingerprint(inputs))
+        logger.info(
+            "The Qdrant collections have been synced.",
+            collection_name=self.retriever_config.collection_name,
+            chunks=self.status.chunks,
+            embedding_cache=self.embedding_client.cache.stats()
+            if self.embedding_client.cache
+            else None,
+        )
+
+    def _sync(self, inputs: dict[str, Any]) -> bool:
+        collection_types: list[CollectionType] = [
+            collection_type
+            for collection_type in COLLECTION_TYPES
+            if not self._is_current(collection_type, inputs)
+        ]
+        if not collection_types:
+            return True
+        # Both collections are streamed from one parse of the corpus.
+        self.parse_corpus(inputs)
+        return self._run(
+            lambda collection_type: self._build(
+                collection_type,
+                inputs,
+                lambda: generate_collection(
+                    self._counted(self.load_corpus(collection_type), collection_type),
+                    self.qdrant_client,
+                    self.retriever_config,
+                    embedding_client=self.embedding_client,
+                    collection_type=collection_type,
+                    mode="sync",
+                    metrics=self.metrics,
+                ),
+            ),
+            collection_types,
+        )
+
+    def update(self, changed_files: Collection[Path]) -> None:
+        """
+        Replace the chunks of the given files in both collections.
+
+        Only these files are parsed again, into the corpus store; chunks of
+        deleted files are removed. Falls back to a full sync if a collection
+        cannot be updated in place. The collections are exported to the
+        snapshots by the next export_snapshots call.
+        """
+        if not changed_files:
+            return
+        names = file_names(changed_files, self.data_path)
+        logger.info("Updating changed files.", num_files=len(names))
+        try:
+            with self._lock:
+                inputs = self.inputs()
+                with self._indexing(), self._phase("update"):
+                    self.parse_corpus(inputs, changed_files)
+                    if not self._run(
+                        lambda collection_type: self._build(
+                            collection_type,
+                            inputs,
+                            lambda: generate_collection(
+                                self._counted(
+                                    self.load_corpus(collection_type, names),
+                                    collection_type,
+                                ),
+                                self.qdrant_client,
+                                self.retriever_config,
+                                embedding_client=self.embedding_client,
+                                collection_type=collection_type,
+                                mode="sync",
+                                files=names,
+                                metrics=self.metrics,
+                            ),
+                        ),
+                        COLLECTION_TYPES,
+                    ):
+                        self._incomplete = True
+                self._snapshots_stale = self.snapshots is not None
+        except IncompatibleCollectionError:
+            logger.warning("Incremental update not possible, running a full sync.")
+            self.sync()
+
+    @staticmethod
+    def _run(
+        build: Callable[[CollectionType], bool],
+        collection_types: Collection[CollectionType],
+    ) -> bool:
+        """Run the builds of the collections in parallel, whether all are complete."""
+        with ThreadPoolExecutor(max_workers=len(collection_types)) as pool:
+            builds = [pool.submit(build, t) for t in collection_types]
+            # Wait for every build, even once one of them is incomplete.
+            results = [future.result() for future in builds]
+        return all(results)
@@ -0,0 +1,84 @@
+"""
+Indexer Setup Module
+
+This module builds the indexer and its embedding client from the settings and
+input parameters, for the backend as well as the standalone index build.
+"""
+
+from qdrant_client import QdrantClient
+
+from flare_ai_rag.ai import EmbeddingCache, GeminiEmbedding, RateLimiter
+from flare_ai_rag.indexer.manifest import IndexManifest
+from flare_ai_rag.indexer.service import Indexer
+from flare_ai_rag.indexer.snapshots import SnapshotStore
+from flare_ai_rag.retriever import RetrieverConfig
+from flare_ai_rag.settings import settings
+from flare_ai_rag.utils.code_data_reader import CodeIngestionBudget
+from flare_ai_rag.utils.progress import PipelineMetrics
+from flare_ai_rag.utils.splitter import ChunkingConfig
+
+
+def setup_embedding_cache() -> EmbeddingCache | None:
+    """Open the persistent embedding cache, unless it is disabled."""
+    if not settings.embedding_cache_enabled:
+        return None
+    return EmbeddingCache(
+        settings.data_path / "embedding_cache.sqlite3",
+        max_entries=settings.embedding_cache_max_entries,
+    )
+
+
+def setup_embedding_client(retriever_config: RetrieverConfig) -> GeminiEmbedding:
+    """
+    Initialize the Gemini Embedding client, sharing one rate limiter between
+    the collection builds so they stay within the embedding quota together.
+    """
+    return GeminiEmbedding(
+        settings.gemini_api_key,
+        rate_limiter=RateLimiter(
+            requests_per_minute=retriever_config.requests_per_minute,
+            tokens_per_minute=retriever_config.tokens_per_minute,
+        ),
+        cache=setup_embedding_cache(),
+    )
+
+
+def setup_indexer(
+    qdrant_client: QdrantClient,
+    input_config: dict,
+    workers: int | None = None,
+    metrics: PipelineMetrics | None = None,
+) -> Indexer:
+    """
+    Initialize the indexer, which syncs the qdrant collections in parallel,
+    only embedding new or changed chunks.
+
+    Args:
+        qdrant_client: Client of the Qdrant instance holding the collections.
+        input_config: Input parameters, with the retriever and chunking config.
+        workers: Number of processes parsing source files, defaults to the
+            `ingestion_workers` setting.
+        metrics: Counters of the pipeline stages, if they are reported.
+    """
+    retriever_config = RetrieverConfig.load(input_config["retriever_config"])
+    return Indexer(
+        qdrant_client,
+        retriever_config,
+        setup_embedding_client(retriever_config),
+        settings.data_path,
+        workers=workers or settings.ingestion_workers,
+        chunking=ChunkingConfig.load(input_config.get("chunking", {})),
+        code_budget=CodeIngestionBudget(
+            memory_mb=settings.code_ingestion_memory_mb,
+            seconds=settings.code_ingestion_time_budget,
+        ),
+        snapshots=SnapshotStore(
+            settings.data_path / "snapshots", qdrant_client, retriever_config
+        )
+        if settings.index_snapshots
+        else None,
+        manifest=IndexManifest(
+            settings.data_path / "index_manifest", qdrant_client, retriever_config
+        ),
+        metrics=metrics,
+    )
@@ -0,0 +1,112 @@
+"""
+Index Snapshots Module
+
+This module exports the Qdrant collections as snapshot files after a sync,
+and at most once per source poll after incremental updates, stamped with a
+fingerprint of the corpus and configuration they were built
+from. A Qdrant instance without collections, e.g. in a new container or on
+another node, is restored from these files when its corpus has the same
+fingerprint, instead of embedding the whole corpus again.
+"""
+
+import json
+import time
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+import httpx
+import structlog
+from qdrant_client import QdrantClient
+
+from flare_ai_rag.retriever import RetrieverConfig, export_snapshot, restore_snapshot
+
+logger = structlog.get_logger(__name__)
+
+
+class SnapshotStore:
+    """Directory of collection snapshots, described by a `manifest.json`."""
+
+    def __init__(
+        self,
+        path: Path,
+        qdrant_client: QdrantClient,
+        retriever_config: RetrieverConfig,
+    ) -> None:
+        """
+        Args:
+            path: Directory holding the snapshots, created if needed.
+            qdrant_client: Client of the Qdrant instance holding the collections.
+            retriever_config: Configuration of the collections.
+        """
+        self.path = path
+        self.qdrant_client = qdrant_client
+        self.retriever_config = retriever_config
+
+    def manifest(self) -> dict[str, Any] | None:
+        manifest = self.path / "manifest.json"
+        if not manifest.exists():
+            return None
+        return json.loads(manifest.read_text())
+
+    def fingerprint(self) -> str | None:
+        """Fingerprint of the corpus the stored snapshots were built from."""
+        manifest = self.manifest()
+        return manifest["fingerprint"] if manifest else None
+
+    def export(self, fingerprint: str, collection_types: Iterable[str]) -> None:
+        """Replace the stored snapshots with snapshots of the live collections."""
+        self.path.mkdir(parents=True, exist_ok=True)
+        manifest = self.path / "manifest.json"
+        # Snapshots being replaced must not be matched with the old manifest.
+        manifest.unlink(missing_ok=True)
+        collections = {}
+        for collection_type in collection_types:
+            file_name = f"{collection_type}.snapshot"
+            export_snapshot(
+                self.qdrant_client,
+                self.retriever_config,
+                collection_type,
+                self.path / file_name,
+            )
+            collections[collection_type] = file_name
+        manifest.write_text(
+            json.dumps(
+                {
+                    "fingerprint": fingerprint,
+                    "created_at": time.time(),
+                    "collections": collections,
+                }
+            )
+        )
+
+    def restore(self, fingerprint: str, collection_types: Iterable[str]) -> bool:
+        """
+        Restore the collections from the stored snapshots, if they were built
+        from a corpus with the given fingerprint.
+
+        Returns:
+            bool: Whether every collection was restored.
+        """
+        manifest = self.manifest()
+        if manifest is None or manifest["fingerprint"] != fingerprint:
+            logger.info("No index snapshot matches the corpus.", path=str(self.path))
+            return False
+        start = time.monotonic()
+        try:
+            for collection_type in collection_types:
+                restore_snapshot(
+                    self.qdrant_client,
+                    self.retriever_config,
+                    collection_type,
+                    self.path / manifest["collections"][collection_type],
+                )
+        except (httpx.HTTPError, KeyError, OSError):
+            logger.exception("Error restoring the index snapshots.")
+            return False
+        logger.info(
+            "Restored the index from snapshots.",
+            fingerprint=fingerprint,
+            seconds=round(time.monotonic() - start, 1),
+        )
+        return True
@@ -0,0 +1,183 @@
+"""
+Source Watcher Module
+
+This module watches the checked out sources under `data/files` for local
+edits, e.g. while authoring docs or with private sources that are not pulled
+from a remote, and hands the files that changed to the indexer. Changes are
+picked up with inotify through the optional `watchdog` package, and by
+polling the modification times of the source files without it. A burst of
+changes is indexed once it settles, so edits are searchable within seconds
+of being saved, without a rebuild or a restart.
+"""
+
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+import structlog
+
+from flare_ai_rag.indexer.service import Indexer
+from flare_ai_rag.utils.data_maker import is_source_file, iter_source_files
+from flare_ai_rag.utils.source_manager import read_settings
+
+logger = structlog.get_logger(__name__)
+
+# Seconds without changes after which the changed files are indexed.
+DEBOUNCE_SECONDS = 2.0
+# Seconds between two scans of the sources when polling.
+POLL_INTERVAL = 2.0
+
+
+class SourceWatcher:
+    """
+    Watches the source files in a background thread, and updates the files
+    that were added, modified or deleted once no change happened for
+    `debounce` seconds.
+    """
+
+    def __init__(
+        self,
+        indexer: Indexer,
+        debounce: float = DEBOUNCE_SECONDS,
+        poll_interval: float = POLL_INTERVAL,
+        *,
+        use_inotify: bool = True,
+    ) -> None:
+        """
+        Args:
+            indexer: Indexer receiving the changed files.
+            debounce: Seconds without changes to wait for before indexing.
+            poll_interval: Seconds between two scans of the source files, when
+                watchdog is not installed or `use_inotify` is not set.
+            use_inotify: Use the `watchdog` package if it is installed.
+        """
+        self.indexer = indexer
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.files_path = indexer.data_path / "files"
+        self._lock = threading.Lock()
+        self._pending: set[Path] = set()
+        self._last_change = 0.0
+        self._sources: list[dict] = []
+        self._state: dict[Path, tuple[int, int]] = {}
+        self._observer: Any = None
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        """Start watching the sources."""
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._sources = read_settings()
+        self._observer = self._start_observer() if self.use_inotify else None
+        if self._observer is None:
+            # Later changes are found by comparing with this scan.
+            self._state = self._scan()
+        self._thread = threading.Thread(
+            target=self._run, daemon=True, name="SourceWatcherThread"
+        )
+        self._thread.start()
+        logger.info(
+            "Source watcher started.",
+            path=str(self.files_path),
+            mode="polling" if self._observer is None else "inotify",
+        )
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Stop watching, waiting up to `timeout` seconds for a running update."""
+        self._stopped.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout)
+            self._observer = None
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def record(self, path: Path) -> None:
+        """Record a change of a path, ignoring paths that are no source files."""
+        if not is_source_file(path, self.indexer.data_path, self._sources):
+            return
+        with self._lock:
+            self._pending.add(path)
+            self._last_change = time.monotonic()
+
+    def _start_observer(self) -> Any:
+        try:
+            from watchdog.events import (  # noqa: PLC0415
+                FileSystemEvent,
+                FileSystemEventHandler,
+            )
+            from watchdog.observers import Observer  # noqa: PLC0415
+        except ImportError:
+            logger.info("The 'watchdog' package is not installed, polling instead.")
+            return None
+
+        watcher = self
+
+        class Handler(FileSystemEventHandler):
+            def on_change(self, event: FileSystemEvent) -> None:
+                if event.is_directory:
+                    return
+                for path in (event.src_path, event.dest_path):
+                    if path:
+                        watcher.record(Path(str(path)))
+
+            # Reads, e.g. by the indexer itself, emit "opened", "accessed" and
+            # "closed_no_write" events, which must not trigger another update.
+            on_created = on_modified = on_moved = on_deleted = on_change
+
+        self.files_path.mkdir(parents=True, exist_ok=True)
+        observer = Observer()
+        observer.schedule(Handler(), str(self.files_path), recursive=True)
+        observer.daemon = True
+        observer.start()
+        return observer
+
+    def _scan(self) -> dict[Path, tuple[int, int]]:
+        state = {}
+        for _, file in iter_source_files(self.indexer.data_path):
+            try:
+                stat = file.stat()
+            except FileNotFoundError:
+                continue
+            state[file] = (stat.st_mtime_ns, stat.st_size)
+        return state
+
+    def _poll(self) -> None:
+        state = self._scan()
+        for file in state.keys() | self._state.keys():
+            if state.get(file) != self._state.get(file):
+                self.record(file)
+        self._state = state
+
+    def _settled(self) -> set[Path]:
+        """Take the pending changes, if no change happened for a while."""
+        with self._lock:
+            if (
+                not self._pending
+                or time.monotonic() - self._last_change < self.debounce
+            ):
+                return set()
+            changed, self._pending = self._pending, set()
+            return changed
+
+    def _run(self) -> None:
+        tick = self.poll_interval if self._observer is None else self.debounce / 4
+        while not self._stopped.wait(tick):
+            changed: set[Path] = set()
+            try:
+                if self._observer is None:
+                    self._poll()
+                changed = self._settled()
+                if changed:
+                    logger.info("Indexing local changes.", num_files=len(changed))
+                    self.indexer.update(changed)
+            except Exception:
+                # Keep watching, the changes are retried with the next ones.
+                logger.exception("Error indexing local changes.")
+                with self._lock:
+                    self._pending |= changed
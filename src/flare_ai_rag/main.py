@@ -8,29 +8,30 @@ Gemini-based Router, Retriever, and Responder components into a chat endpoint.
 
 from contextlib import asynccontextmanager
 
-import pandas as pd
 import structlog
 import uvicorn
 from fastapi import APIRouter, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from qdrant_client import QdrantClient
 
-from flare_ai_rag.ai import GeminiEmbedding, GeminiProvider
-from flare_ai_rag.api import BaseRouter, ChatRouter
+from flare_ai_rag.ai import GeminiProvider
+from flare_ai_rag.api import BaseRouter, ChatRouter, HealthRouter
 from flare_ai_rag.attestation import Vtpm
 from flare_ai_rag.bot_manager import start_bot_manager
+from flare_ai_rag.indexer import Indexer, SourceScheduler, SourceWatcher
+from flare_ai_rag.indexer.setup import setup_indexer
 from flare_ai_rag.prompts import PromptService
 from flare_ai_rag.responder import GeminiResponder, ResponderConfig
-from flare_ai_rag.retriever import QdrantRetriever, RetrieverConfig, generate_collection
+from flare_ai_rag.retriever import QdrantRetriever, RetrieverConfig
 from flare_ai_rag.router import GeminiRouter, RouterConfig
 from flare_ai_rag.settings import settings
 from flare_ai_rag.utils import load_json
-from flare_ai_rag.utils.code_data_reader import get_code_data
-from flare_ai_rag.utils.data_maker import make_data
-from flare_ai_rag.utils.source_manager import update_sources
 
 logger = structlog.get_logger(__name__)
 
+# Seconds the shutdown waits for a running index build.
+SHUTDOWN_TIMEOUT = 30
+
 
 def setup_router(input_config: dict) -> tuple[GeminiProvider, GeminiRouter]:
     """Initialize a Gemini Provider for routing."""
@@ -51,40 +52,18 @@ def setup_router(input_config: dict) -> tuple[GeminiProvider, GeminiRouter]:
 def setup_retriever(
     qdrant_client: QdrantClient,
     input_config: dict,
-    df_docs: pd.DataFrame,
-) -> QdrantRetriever:
-    """Initialize the Qdrant retriever."""
-    # Set up Qdrant config
-    retriever_config = RetrieverConfig.load(input_config["retriever_config"])
-
-    # Set up Gemini Embedding client
-    embedding_client = GeminiEmbedding(settings.gemini_api_key)
-    # (Re)generate qdrant collection
-
-    generate_collection(
-        df_docs,
-        qdrant_client,
-        retriever_config,
-        embedding_client=embedding_client,
-        collection_type="answer",
-    )
-    generate_collection(
-        df_docs,
-        qdrant_client,
-        retriever_config,
-        embedding_client=embedding_client,
-        collection_type="code",
-    )
-    logger.info(
-        "The Qdrant collection has been generated.",
-        collection_name=retriever_config.collection_name,
-    )
-    # Return retriever
-    return QdrantRetriever(
+) -> tuple[QdrantRetriever, Indexer]:
+    """Initialize the Qdrant retriever and the indexer keeping it up to date."""
+    # The indexer syncs the qdrant collections in the background, in parallel,
+    # only embedding new or changed chunks.
+    indexer = setup_indexer(qdrant_client, input_config)
+    # Return retriever, sharing the embedding client and its rate limiter.
+    retriever = QdrantRetriever(
         client=qdrant_client,
-        retriever_config=retriever_config,
-        embedding_client=embedding_client,
+        retriever_config=indexer.retriever_config,
+        embedding_client=indexer.embedding_client,
     )
+    return retriever, indexer
 
 
 def setup_qdrant(input_config: dict) -> QdrantClient:
@@ -120,9 +99,13 @@ def create_app() -> (FastAPI, BaseRouter):
       1. Creates a new FastAPI instance with optional CORS middleware.
       2. Loads configuration.
       3. Sets up the Gemini Router, Qdrant Retriever, and Gemini Responder.
-      4. Loads RAG data and (re)generates the Qdrant collection.
-      5. Initializes a ChatRouter that wraps the RAG pipeline.
-      6. Registers the chat endpoint under the /chat prefix.
+      4. Initializes a ChatRouter that wraps the RAG pipeline.
+      5. Registers the chat endpoint under the /chat prefix, and the readiness
+         endpoint under the /health prefix.
+
+    The document sources are pulled and streamed into the Qdrant collections
+    in the background once the server has started, while the collections of
+    the last build keep being served.
 
     Returns:
         FastAPI: The configured FastAPI application instance.
@@ -131,17 +114,6 @@ def create_app() -> (FastAPI, BaseRouter):
     # Load input configuration.
     input_config = load_json(settings.input_path / "input_parameters.json")
 
-    # generate data
-    update_sources()
-    make_data(settings.data_path)
-
-    # Load RAG data.
-    code_data = pd.json_normalize(get_code_data(settings.data_path / "contracts.json"))
-    docs_data = pd.read_json(settings.data_path / "data.json")
-
-    data = pd.concat([docs_data, code_data], ignore_index=True)
-    logger.info("Loaded JSON Data.", num_rows=len(data))
-
     # Set up the RAG components: 1. Gemini Provider
     base_ai, router_component = setup_router(input_config)
 
@@ -149,7 +121,7 @@ def create_app() -> (FastAPI, BaseRouter):
     qdrant_client = setup_qdrant(input_config)
 
     # 2b. Set up the Retriever.
-    retriever_component = setup_retriever(qdrant_client, input_config, data)
+    retriever_component, indexer = setup_retriever(qdrant_client, input_config)
 
     # 3. Set up the Responder.
     responder_component = setup_responder(input_config)
@@ -177,7 +149,22 @@ def create_app() -> (FastAPI, BaseRouter):
     @asynccontextmanager
     async def lifespan(app: FastAPI):
         bm = start_bot_manager(bot_router)
+        # Build the index in the background, then poll the sources so upstream
+        # doc changes are indexed while serving.
+        scheduler = SourceScheduler(indexer, settings.source_poll_interval)
+        scheduler.start()
+        # Index local edits of the sources within seconds, if enabled.
+        watcher = SourceWatcher(
+            indexer,
+            debounce=settings.source_watch_debounce,
+            poll_interval=settings.source_watch_poll_interval,
+        )
+        if settings.source_watch:
+            watcher.start()
         yield
+        watcher.stop(timeout=SHUTDOWN_TIMEOUT)
+        # A sync interrupted by the shutdown resumes with the next one.
+        scheduler.stop(timeout=SHUTDOWN_TIMEOUT)
         bm.cancel()
 
     app = FastAPI(title="RAG Knowledge API", version="1.0", redirect_slashes=False, lifespan=lifespan)
@@ -191,6 +178,11 @@ def create_app() -> (FastAPI, BaseRouter):
     )
 
     app.include_router(chat_router.router, prefix="/api/routes/chat", tags=["chat"])
+    app.include_router(
+        HealthRouter(router=APIRouter(), indexer=indexer).router,
+        prefix="/api/routes/health",
+        tags=["health"],
+    )
 
     return app
 
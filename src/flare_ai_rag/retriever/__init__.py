@@ -1,6 +1,21 @@
 from .base import BaseRetriever
 from .config import RetrieverConfig
-from .qdrant_collection import generate_collection
+from .qdrant_collection import (
+    IncompatibleCollectionError,
+    export_snapshot,
+    generate_collection,
+    live_collection,
+    restore_snapshot,
+)
 from .qdrant_retriever import QdrantRetriever
 
-__all__ = ["BaseRetriever", "QdrantRetriever", "RetrieverConfig", "generate_collection"]
+__all__ = [
+    "BaseRetriever",
+    "IncompatibleCollectionError",
+    "QdrantRetriever",
+    "RetrieverConfig",
+    "export_snapshot",
+    "generate_collection",
+    "live_collection",
+    "restore_snapshot",
+]
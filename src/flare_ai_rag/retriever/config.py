@@ -11,6 +11,10 @@ class RetrieverConfig:
     vector_size: int
     host: str
     port: int
+    embedding_workers: int = 4
+    requests_per_minute: int = 1500
+    tokens_per_minute: int | None = None
+    dedup_threshold: float | None = 0.85
 
     @staticmethod
     def load(retriever_config: dict[str, Any]) -> "RetrieverConfig":
@@ -20,4 +24,8 @@ class RetrieverConfig:
             vector_size=retriever_config["vector_size"],
             host=retriever_config["host"],
             port=retriever_config["port"],
+            embedding_workers=retriever_config.get("embedding_workers", 4),
+            requests_per_minute=retriever_config.get("requests_per_minute", 1500),
+            tokens_per_minute=retriever_config.get("tokens_per_minute"),
+            dedup_threshold=retriever_config.get("dedup_threshold", 0.85),
         )
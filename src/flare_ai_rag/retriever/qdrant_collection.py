@@ -1,14 +1,78 @@
-import google.api_core.exceptions
-import pandas as pd
+import hashlib
+import time
+import uuid
+from collections.abc import Collection, Iterable, Iterator
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+from typing import Literal
+
+import httpx
 import structlog
 from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, PointStruct, VectorParams
+from qdrant_client.http.models import (
+    CreateAlias,
+    CreateAliasOperation,
+    DeleteAlias,
+    DeleteAliasOperation,
+    DeletePayload,
+    DeletePayloadOperation,
+    Distance,
+    FieldCondition,
+    Filter,
+    MatchAny,
+    PayloadSchemaType,
+    PointIdsList,
+    PointStruct,
+    QueryRequest,
+    ScoredPoint,
+    SetPayload,
+    SetPayloadOperation,
+    VectorParams,
+)
 
-from flare_ai_rag.ai import EmbeddingTaskType, GeminiEmbedding
+from flare_ai_rag.ai import EmbeddingExecutor, EmbeddingTaskType, GeminiEmbedding
 from flare_ai_rag.retriever.config import RetrieverConfig
+from flare_ai_rag.utils.dedup import NearDuplicateIndex
+from flare_ai_rag.utils.pipeline import staged
+from flare_ai_rag.utils.progress import PipelineMetrics
+from flare_ai_rag.utils.records import ChunkRecord
 
 logger = structlog.get_logger(__name__)
 
+SyncMode = Literal["rebuild", "sync"]
+
+SCROLL_PAGE_SIZE = 1000
+# Versioned collections are named "<alias><separator><version>".
+VERSION_SEPARATOR = "_v"
+# Number of chunks handed to the embedding client, and then upserted, at once.
+EMBED_BATCH_SIZE = 100
+# Number of batches buffered between two pipeline stages.
+STAGE_QUEUE_SIZE = 4
+# Number of payload updates sent to Qdrant at once.
+PAYLOAD_BATCH_SIZE = 500
+# Number of the most similar stored points compared with a chunk embedded by a
+# file-scoped update, to find a near duplicate in the other files.
+STORED_DUPLICATE_CANDIDATES = 3
+# Seconds allowed for a snapshot to be downloaded or uploaded and recovered.
+SNAPSHOT_TIMEOUT = 600
+
+
+class IncompatibleCollectionError(ValueError):
+    """Individual files cannot be synced, there is no compatible collection."""
+
+
+def point_id(source: str, file_name: str, content: str, embedding_model: str) -> str:
+    """
+    Derive a stable Qdrant point ID for a chunk.
+
+    The ID only depends on where the chunk comes from, its text and the model
+    used to embed it, so an unchanged chunk keeps its ID across runs.
+    """
+    key = f"{source}\x1f{file_name}\x1f{content}\x1f{embedding_model}"
+    digest = hashlib.sha256(key.encode("utf-8")).digest()
+    return str(uuid.UUID(bytes=digest[:16]))
+
 
 def _create_collection(
     client: QdrantClient, collection_name: str, vector_size: int
@@ -22,30 +86,280 @@ def _create_collection(
         collection_name=collection_name,
         vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE),
     )
+    # Incremental updates look up the points of individual files, and the
+    # points their chunks were collapsed into.
+    for field_name in ("filename", "files"):
+        client.create_payload_index(
+            collection_name=collection_name,
+            field_name=field_name,
+            field_schema=PayloadSchemaType.KEYWORD,
+        )
 
 
-def generate_collection(
-    df_docs: pd.DataFrame,
-    qdrant_client: QdrantClient,
-    retriever_config: RetrieverConfig,
-    embedding_client: GeminiEmbedding,
-    collection_type: str,
-) -> None:
-    """Routine for generating a Qdrant collection for a specific CSV file type."""
-    _create_collection(
-        qdrant_client,
-        retriever_config.collection_name + collection_type,
-        retriever_config.vector_size,
+def _resolve_alias(client: QdrantClient, alias_name: str) -> str | None:
+    """Return the collection an alias currently points to, if any."""
+    for alias in client.get_aliases().aliases:
+        if alias.alias_name == alias_name:
+            return alias.collection_name
+    return None
+
+
+def live_collection(
+    client: QdrantClient, retriever_config: RetrieverConfig, collection_type: str
+) -> str | None:
+    """Return the versioned collection serving a collection type, if any."""
+    return _resolve_alias(client, retriever_config.collection_name + collection_type)
+
+
+def _is_compatible(
+    client: QdrantClient, collection_name: str, vector_size: int
+) -> bool:
+    vectors = client.get_collection(collection_name).config.params.vectors
+    return isinstance(vectors, VectorParams) and vectors.size == vector_size
+
+
+def _versioned_name(alias_name: str) -> str:
+    return f"{alias_name}{VERSION_SEPARATOR}{time.time_ns() // 1_000_000}"
+
+
+def _switch_alias(client: QdrantClient, alias_name: str, collection_name: str) -> None:
+    """Atomically point the alias at a new collection."""
+    operations: list[CreateAliasOperation | DeleteAliasOperation] = []
+    if _resolve_alias(client, alias_name) is not None:
+        operations.append(
+            DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=alias_name))
+        )
+    elif alias_name in _collection_names(client):
+        # Collections built before aliases were introduced use the alias name
+        # itself, which has to be freed before the alias can be created.
+        client.delete_collection(alias_name)
+    operations.append(
+        CreateAliasOperation(
+            create_alias=CreateAlias(
+                collection_name=collection_name, alias_name=alias_name
+            )
+        )
     )
+    client.update_collection_aliases(change_aliases_operations=operations)
     logger.info(
-        "Created the collection.",
-        collection_name=retriever_config.collection_name + collection_type,
+        "Switched collection alias.",
+        alias_name=alias_name,
+        collection_name=collection_name,
     )
 
-    points = []
-    for idx, (_, row) in enumerate(
-        df_docs.iterrows(), start=1
-    ):  # Using _ for unused variable
+
+def _collection_names(client: QdrantClient) -> list[str]:
+    return [collection.name for collection in client.get_collections().collections]
+
+
+def _garbage_collect(client: QdrantClient, alias_name: str, keep: str) -> None:
+    """Delete the old versions of an aliased collection."""
+    prefix = alias_name + VERSION_SEPARATOR
+    for name in _collection_names(client):
+        if name.startswith(prefix) and name != keep:
+            client.delete_collection(name)
+            logger.info("Deleted old collection version.", collection_name=name)
+
+
+def _existing_points(
+    client: QdrantClient,
+    collection_name: str,
+    files: Collection[str] | None = None,
+) -> dict[str, list[str] | None]:
+    """
+    Collect the points stored in a collection, or the points of some files,
+    including the points of other files that some of them were collapsed into.
+
+    :return: The point IDs, with the files each point stands for if it was
+        collapsed from duplicates.
+    """
+    scroll_filter = None
+    if files is not None:
+        scroll_filter = Filter(
+            should=[
+                FieldCondition(key=key, match=MatchAny(any=list(files)))
+                for key in ("filename", "files")
+            ]
+        )
+    points: dict[str, list[str] | None] = {}
+    offset = None
+    while True:
+        records, offset = client.scroll(
+            collection_name=collection_name,
+            scroll_filter=scroll_filter,
+            limit=SCROLL_PAGE_SIZE,
+            offset=offset,
+            with_payload=["files"],
+            with_vectors=False,
+        )
+        for record in records:
+            points[str(record.id)] = (record.payload or {}).get("files")
+        if offset is None:
+            return points
+
+
+def _prepare_collection(  # noqa: PLR0913
+    client: QdrantClient,
+    alias_name: str,
+    current: str | None,
+    vector_size: int,
+    mode: SyncMode,
+    files: Collection[str] | None,
+) -> tuple[str, dict[str, list[str] | None]]:
+    """
+    Choose the collection to write to.
+
+    In sync mode the collection behind the alias is updated in place, if it is
+    compatible. Otherwise a new versioned collection is created, which only
+    replaces the live one once it has been filled.
+
+    :return: The collection name and the points it already stores, limited to
+        the points of `files` if given.
+    """
+    if (
+        mode == "sync"
+        and current is not None
+        and _is_compatible(client, current, vector_size)
+    ):
+        existing = _existing_points(client, current, files)
+        logger.info(
+            "Syncing the existing collection.",
+            collection_name=current,
+            num_points=len(existing),
+            num_files=None if files is None else len(files),
+        )
+        return current, existing
+
+    if files is not None:
+        msg = (
+            f"Updating individual files of {alias_name} requires a compatible "
+            "collection to sync."
+        )
+        raise IncompatibleCollectionError(msg)
+
+    collection_name = _versioned_name(alias_name)
+    _create_collection(client, collection_name, vector_size)
+    logger.info("Created the collection.", collection_name=collection_name)
+    return collection_name, {}
+
+
+def _embed_points(
+    rows: list[tuple[str, ChunkRecord]],
+    retriever_config: RetrieverConfig,
+    embedding_client: GeminiEmbedding,
+    metrics: PipelineMetrics | None = None,
+    stage: str = "embeddings",
+) -> list[PointStruct] | None:
+    """
+    Embed a batch of rows in as few requests as possible and build their points.
+
+    :return: The points, or None if the batch could not be embedded.
+    """
+    start = time.monotonic()
+    try:
+        embeddings = embedding_client.embed_batch(
+            embedding_model=retriever_config.embedding_model,
+            contents=[row["content"] for _, row in rows],
+            task_type=EmbeddingTaskType.RETRIEVAL_DOCUMENT,
+            titles=[row["file_name"] for _, row in rows],
+        )
+    except Exception:
+        # Log the full traceback; the chunks are retried by the next sync.
+        logger.exception(
+            "Error encoding documents.",
+            filenames=sorted({row["file_name"] for _, row in rows}),
+        )
+        return None
+    if metrics is not None:
+        metrics.add(stage, len(embeddings), time.monotonic() - start)
+
+    return [
+        PointStruct(
+            id=chunk_id,
+            vector=embedding,
+            payload={
+                "filename": row["file_name"],
+                "metadata": row["meta_data"],
+                "text": row["content"],
+            },
+        )
+        for (chunk_id, row), embedding in zip(rows, embeddings, strict=True)
+    ]
+
+
+@dataclass
+class _Build:
+    """State collected while streaming records into a collection."""
+
+    # Points stored before the build, with the files they stand for.
+    existing: dict[str, list[str] | None]
+    dedup: NearDuplicateIndex | None
+    # Files a file-scoped update is limited to.
+    files: Collection[str] | None = None
+    # IDs of every valid, non-duplicate chunk, whether stored already or not.
+    seen_ids: set[str] = field(default_factory=set)
+    upserted_ids: set[str] = field(default_factory=set)
+    # Files every non-duplicate chunk appears in, its own file first.
+    point_files: dict[str, list[str]] = field(default_factory=dict)
+    num_duplicates: int = 0
+    # Embedded chunks of a file-scoped update that are near duplicates of a
+    # point stored for another file, with that point.
+    stored_duplicates: dict[str, ScoredPoint] = field(default_factory=dict)
+    # Batches that could not be embedded, whose chunks are missing.
+    failed_batches: int = 0
+
+    def collapse_duplicate(self, chunk_id: str, row: ChunkRecord) -> bool:
+        """Add the row's file to an earlier near duplicate, if there is one."""
+        if self.dedup is None:
+            return False
+        original = self.dedup.find_or_add(chunk_id, row["content"])
+        if original is None:
+            self.point_files[chunk_id] = [row["file_name"]]
+            return False
+        self.num_duplicates += 1
+        names = self.point_files[original]
+        if row["file_name"] not in names:
+            names.append(row["file_name"])
+        return True
+
+    def collapse_stored_duplicates(self) -> None:
+        """Add the files of every stored duplicate to the stored point."""
+        for chunk_id, original in self.stored_duplicates.items():
+            self.num_duplicates += 1
+            self.seen_ids.discard(chunk_id)
+            names = self.point_files.pop(chunk_id)
+            original_id = str(original.id)
+            if original_id not in self.point_files:
+                payload = original.payload or {}
+                stored = payload.get("files")
+                self.existing[original_id] = stored
+                self.seen_ids.add(original_id)
+                # The synced files list their own chunks again.
+                self.point_files[original_id] = [
+                    name
+                    for name in stored or [payload["filename"]]
+                    if self.files is None or name not in self.files
+                ]
+            original_names = self.point_files[original_id]
+            original_names.extend(name for name in names if name not in original_names)
+
+
+def _pending_batches(
+    records: Iterable[ChunkRecord],
+    collection_type: str,
+    embedding_model: str,
+    build: _Build,
+) -> Iterator[list[tuple[str, ChunkRecord]]]:
+    """
+    Yield batches of rows that still need to be embedded.
+
+    Every valid chunk ID is recorded in `build.seen_ids`, including the ones
+    that are already stored and therefore not yielded. Near duplicates of an
+    earlier chunk are not yielded either; their file is added to the files of
+    the earlier chunk instead.
+    """
+    pending: list[tuple[str, ChunkRecord]] = []
+    for idx, row in enumerate(records, start=1):
         if row["type"] != collection_type:
             continue
         content = row["content"]
@@ -55,66 +369,417 @@ def generate_collection(
             idx=idx,
         )
 
-        if not isinstance(content, str):
+        if not content:
             logger.warning(
                 "Skipping document due to missing or invalid content.",
                 filename=row["file_name"],
             )
             continue
 
-        try:
-            embedding = embedding_client.embed_content(
-                embedding_model=retriever_config.embedding_model,
-                task_type=EmbeddingTaskType.RETRIEVAL_DOCUMENT,
-                contents=content,
-                title=str(row["file_name"]),
-            )
-        except google.api_core.exceptions.InvalidArgument as e:
-            # Check if it's the known "Request payload size exceeds the limit" error
-            # If so, downgrade it to a warning
-            if "400 Request payload size exceeds the limit" in str(e):
-                logger.warning(
-                    "Skipping document due to size limit.",
-                    filename=row["file_name"],
-                    size=len(content),
-                )
-                continue
-            # Log the full traceback for other InvalidArgument errors
-            logger.exception(
-                "Error encoding document (InvalidArgument).",
-                filename=row["file_name"],
+        chunk_id = point_id(
+            row["source"],
+            row["file_name"],
+            content,
+            embedding_model,
+        )
+        if chunk_id in build.seen_ids:
+            continue
+        if build.collapse_duplicate(chunk_id, row):
+            continue
+        build.seen_ids.add(chunk_id)
+        if chunk_id in build.existing:
+            continue
+
+        pending.append((chunk_id, row))
+        if len(pending) >= EMBED_BATCH_SIZE:
+            yield pending
+            pending = []
+
+    if pending:
+        yield pending
+
+
+def _find_stored_duplicates(
+    client: QdrantClient,
+    collection_name: str,
+    points: list[PointStruct],
+    build: _Build,
+) -> list[PointStruct]:
+    """
+    Set aside the points that are near duplicates of a point stored for a file
+    the update is not limited to, in `build.stored_duplicates`.
+
+    The duplicate index of a file-scoped update only holds the chunks of the
+    synced files, so the stored points most similar to each embedded chunk are
+    compared with it instead.
+
+    :return: The points to upsert.
+    """
+    if build.dedup is None or build.files is None:
+        return points
+    other_files = Filter(
+        must_not=[FieldCondition(key="filename", match=MatchAny(any=list(build.files)))]
+    )
+    responses = client.query_batch_points(
+        collection_name=collection_name,
+        requests=[
+            QueryRequest(
+                query=point.vector,  # pyright: ignore [reportArgumentType]
+                filter=other_files,
+                limit=STORED_DUPLICATE_CANDIDATES,
+                with_payload=["filename", "files", "text"],
             )
+            for point in points
+        ],
+    )
+    unique: list[PointStruct] = []
+    for point, response in zip(points, responses, strict=True):
+        text = (point.payload or {})["text"]
+        original = next(
+            (
+                candidate
+                for candidate in response.points
+                if build.dedup.matches(text, (candidate.payload or {}).get("text", ""))
+            ),
+            None,
+        )
+        if original is None:
+            unique.append(point)
+        else:
+            build.stored_duplicates[str(point.id)] = original
+    return unique
+
+
+def _fill_collection(  # noqa: PLR0913
+    records: Iterable[ChunkRecord],
+    qdrant_client: QdrantClient,
+    collection_name: str,
+    retriever_config: RetrieverConfig,
+    embedding_client: GeminiEmbedding,
+    collection_type: str,
+    build: _Build,
+    metrics: PipelineMetrics | None = None,
+) -> int:
+    """
+    Stream the records into a collection, counting the embedded and upserted
+    points in `metrics`, and the batches that failed to embed in `build`.
+
+    :return: The number of upserted points.
+    """
+    batches = _pending_batches(
+        records, collection_type, retriever_config.embedding_model, build
+    )
+    executor = EmbeddingExecutor(workers=retriever_config.embedding_workers)
+    embedded = executor.map(
+        partial(
+            _embed_points,
+            retriever_config=retriever_config,
+            embedding_client=embedding_client,
+            metrics=metrics,
+            stage=f"{collection_type}.embeddings",
+        ),
+        staged(batches, STAGE_QUEUE_SIZE, name=f"chunk-{collection_type}"),
+    )
+
+    num_points = 0
+    for batch in staged(embedded, STAGE_QUEUE_SIZE, name=f"embed-{collection_type}"):
+        if batch is None:
+            build.failed_batches += 1
             continue
-        except Exception:
-            # Log the full traceback for any other errors
-            logger.exception(
-                "Error encoding document (general).",
-                filename=row["file_name"],
+        points = _find_stored_duplicates(qdrant_client, collection_name, batch, build)
+        if not points:
+            continue
+        start = time.monotonic()
+        qdrant_client.upsert(collection_name=collection_name, points=points)
+        if metrics is not None:
+            metrics.add(
+                f"{collection_type}.upserts", len(points), time.monotonic() - start
             )
+        build.upserted_ids.update(str(point.id) for point in points)
+        num_points += len(points)
+        logger.info(
+            "Upserted points.", collection_name=collection_name, num_points=num_points
+        )
+    return num_points
+
+
+def _update_point_files(
+    client: QdrantClient, collection_name: str, build: _Build
+) -> None:
+    """Record in every stored point which files its chunk was collapsed from."""
+    build.collapse_stored_duplicates()
+    operations: list[SetPayloadOperation | DeletePayloadOperation] = []
+    for chunk_id, names in build.point_files.items():
+        if chunk_id not in build.existing and chunk_id not in build.upserted_ids:
+            continue
+        files = names if len(names) > 1 else None
+        if files == build.existing.get(chunk_id):
             continue
+        if files is None:
+            operations.append(_delete_files_operation(chunk_id))
+        else:
+            operations.append(_set_payload_operation(chunk_id, {"files": files}))
+    _apply(client, collection_name, operations)
+    if build.num_duplicates:
+        logger.info(
+            "Collapsed duplicate chunks.",
+            collection_name=collection_name,
+            num_duplicates=build.num_duplicates,
+            num_updated=len(operations),
+        )
 
-        payload = {
-            "filename": row["file_name"],
-            "metadata": row["meta_data"],
-            "text": content,
-        }
 
-        point = PointStruct(
-            id=idx,  # Using integer ID starting from 1
-            vector=embedding,
-            payload=payload,
+def _delete_stale(
+    client: QdrantClient,
+    collection_name: str,
+    build: _Build,
+    files: Collection[str] | None,
+) -> None:
+    """
+    Delete the points whose chunk disappeared from the corpus.
+
+    When only some files are synced, a point of one of them may also stand for
+    duplicates in files that were not synced. Such a point is handed over to
+    the first remaining file instead of being deleted.
+    """
+    stale_ids = build.existing.keys() - build.seen_ids
+    operations: list[SetPayloadOperation | DeletePayloadOperation] = []
+    deleted: list[str] = []
+    for chunk_id in stale_ids:
+        remaining = [
+            name
+            for name in build.existing[chunk_id] or []
+            if files is not None and name not in files
+        ]
+        if not remaining:
+            deleted.append(chunk_id)
+            continue
+        operations.append(_set_payload_operation(chunk_id, {"filename": remaining[0]}))
+        if len(remaining) > 1:
+            operations.append(_set_payload_operation(chunk_id, {"files": remaining}))
+        else:
+            operations.append(_delete_files_operation(chunk_id))
+    _apply(client, collection_name, operations)
+    if deleted:
+        client.delete(
+            collection_name=collection_name,
+            points_selector=PointIdsList(points=list(deleted)),
+        )
+        logger.info(
+            "Deleted stale points.",
+            collection_name=collection_name,
+            num_points=len(deleted),
+        )
+
+
+def _set_payload_operation(chunk_id: str, payload: dict) -> SetPayloadOperation:
+    return SetPayloadOperation(
+        set_payload=SetPayload(payload=payload, points=[chunk_id])
+    )
+
+
+def _delete_files_operation(chunk_id: str) -> DeletePayloadOperation:
+    return DeletePayloadOperation(
+        delete_payload=DeletePayload(keys=["files"], points=[chunk_id])
+    )
+
+
+def _apply(
+    client: QdrantClient,
+    collection_name: str,
+    operations: list[SetPayloadOperation | DeletePayloadOperation],
+) -> None:
+    for start in range(0, len(operations), PAYLOAD_BATCH_SIZE):
+        client.batch_update_points(
+            collection_name=collection_name,
+            update_operations=operations[start : start + PAYLOAD_BATCH_SIZE],
         )
-        points.append(point)
 
-    if points:
-        qdrant_client.upsert(
-            collection_name=retriever_config.collection_name + collection_type,
-            points=points,
+
+def generate_collection(  # noqa: PLR0913
+    records: Iterable[ChunkRecord],
+    qdrant_client: QdrantClient,
+    retriever_config: RetrieverConfig,
+    embedding_client: GeminiEmbedding,
+    collection_type: str,
+    mode: SyncMode = "rebuild",
+    files: Collection[str] | None = None,
+    metrics: PipelineMetrics | None = None,
+) -> bool:
+    """
+    Routine for generating a Qdrant collection for a specific document type.
+
+    The collection is served through the alias
+    `retriever_config.collection_name + collection_type`. In "rebuild" mode every
+    chunk is embedded into a new versioned collection, and the alias is switched
+    over atomically once it is filled, so searches never see a half-built index.
+    Old versions are deleted afterwards. If a batch of chunks failed to embed,
+    the new version is dropped and the previous one keeps being served; only
+    without a previous version is the incomplete one published.
+    In "sync" mode the live collection is updated in place: only chunks whose
+    stable ID is not stored yet are embedded and upserted, and points whose
+    chunk disappeared from the corpus are deleted.
+    With `retriever_config.dedup_threshold` set, near-duplicate chunks collapse
+    into the point of the first one, whose "files" payload lists every file the
+    chunk appears in.
+    Passing `files` limits a sync to the chunks of those file names: `records`
+    then only has to cover these files, and the points of all other files are
+    left untouched, apart from their "files" payload. The chunks embedded for
+    these files are compared with the most similar points of the other files,
+    so that near duplicates across them still collapse. This raises an
+    IncompatibleCollectionError if there is no collection to sync.
+
+    The records are consumed as a stream: chunking, embedding and upserting run
+    as separate stages connected by bounded queues, so memory stays flat and the
+    first points are searchable while the rest are still being embedded.
+    Batches are embedded concurrently by `retriever_config.embedding_workers`
+    threads; the embedding client's rate limiter keeps them within quota.
+    The points embedded and upserted by these stages are counted in `metrics`,
+    as "<collection_type>.embeddings" and "<collection_type>.upserts".
+
+    :return: Whether every batch was embedded. Chunks of a batch that failed
+        are missing from the collection until they are synced again.
+    """
+    alias_name = retriever_config.collection_name + collection_type
+    current = _resolve_alias(qdrant_client, alias_name)
+    collection_name, existing = _prepare_collection(
+        qdrant_client, alias_name, current, retriever_config.vector_size, mode, files
+    )
+    is_new = collection_name != current
+    build = _Build(
+        existing=existing,
+        dedup=NearDuplicateIndex(retriever_config.dedup_threshold)
+        if retriever_config.dedup_threshold
+        else None,
+        files=files,
+    )
+
+    try:
+        num_points = _fill_collection(
+            records,
+            qdrant_client,
+            collection_name,
+            retriever_config,
+            embedding_client,
+            collection_type,
+            build,
+            metrics,
         )
+        _update_point_files(qdrant_client, collection_name, build)
+    except Exception:
+        if is_new:
+            qdrant_client.delete_collection(collection_name)
+        raise
+
+    if num_points:
         logger.info(
             "Collection generated and documents inserted into Qdrant successfully.",
-            collection_name=retriever_config.collection_name + collection_type,
-            num_points=len(points),
+            collection_name=collection_name,
+            num_points=num_points,
         )
-    else:
+    elif not build.seen_ids:
         logger.warning("No valid documents found to insert.")
+    else:
+        logger.info("Collection is up to date.", collection_name=collection_name)
+
+    if is_new:
+        if build.failed_batches and (
+            not num_points
+            or current is not None
+            or alias_name in _collection_names(qdrant_client)
+        ):
+            # Keep serving the complete previous version.
+            logger.warning(
+                "Discarding incomplete collection build.",
+                collection_name=collection_name,
+                failed_batches=build.failed_batches,
+            )
+            qdrant_client.delete_collection(collection_name)
+            return False
+        _switch_alias(qdrant_client, alias_name, collection_name)
+        _garbage_collect(qdrant_client, alias_name, keep=collection_name)
+    else:
+        _delete_stale(qdrant_client, collection_name, build, files)
+    return not build.failed_batches
+
+
+def _rest_url(retriever_config: RetrieverConfig) -> str:
+    return f"http://{retriever_config.host}:{retriever_config.port}"
+
+
+def export_snapshot(
+    qdrant_client: QdrantClient,
+    retriever_config: RetrieverConfig,
+    collection_type: str,
+    path: Path,
+) -> None:
+    """
+    Download a snapshot of the collection served for a document type to `path`.
+
+    The snapshot is created on the Qdrant server, streamed to a temporary file
+    next to `path`, which replaces `path` once complete, and then deleted from
+    the server.
+    """
+    alias_name = retriever_config.collection_name + collection_type
+    collection_name = _resolve_alias(qdrant_client, alias_name) or alias_name
+    snapshot = qdrant_client.create_snapshot(collection_name, wait=True)
+    if snapshot is None:
+        msg = f"Qdrant did not create a snapshot of {collection_name}."
+        raise RuntimeError(msg)
+    url = (
+        f"{_rest_url(retriever_config)}/collections/{collection_name}"
+        f"/snapshots/{snapshot.name}"
+    )
+    tmp_path = path.with_name(path.name + ".tmp")
+    try:
+        with (
+            httpx.stream("GET", url, timeout=SNAPSHOT_TIMEOUT) as response,
+            tmp_path.open("wb") as f,
+        ):
+            response.raise_for_status()
+            for data in response.iter_bytes():
+                f.write(data)
+        tmp_path.replace(path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+        qdrant_client.delete_snapshot(collection_name, snapshot.name)
+    logger.info(
+        "Exported collection snapshot.",
+        collection_name=collection_name,
+        path=str(path),
+        size=path.stat().st_size,
+    )
+
+
+def restore_snapshot(
+    qdrant_client: QdrantClient,
+    retriever_config: RetrieverConfig,
+    collection_type: str,
+    path: Path,
+) -> None:
+    """
+    Recover the collection served for a document type from a snapshot file.
+
+    The snapshot is uploaded into a new versioned collection, and the alias is
+    switched over to it once it has been recovered, like after a rebuild.
+    """
+    alias_name = retriever_config.collection_name + collection_type
+    collection_name = _versioned_name(alias_name)
+    url = (
+        f"{_rest_url(retriever_config)}/collections/{collection_name}/snapshots/upload"
+    )
+    with path.open("rb") as f:
+        response = httpx.post(
+            url,
+            params={"priority": "snapshot", "wait": "true"},
+            files={"snapshot": (path.name, f)},
+            timeout=SNAPSHOT_TIMEOUT,
+        )
+    response.raise_for_status()
+    _switch_alias(qdrant_client, alias_name, collection_name)
+    _garbage_collect(qdrant_client, alias_name, keep=collection_name)
+    logger.info(
+        "Restored collection snapshot.",
+        collection_name=collection_name,
+        path=str(path),
+    )
@@ -38,7 +38,8 @@ class QdrantRetriever(BaseRetriever):
             task_type=EmbeddingTaskType.RETRIEVAL_QUERY,
         )
 
-        # Search Qdrant for similar vectors.
+        # Search Qdrant for similar vectors. The name is an alias that is switched
+        # atomically when a rebuilt collection is ready.
         results = self.client.search(
             collection_name=self.retriever_config.collection_name + collection_type,
             query_vector=query_vector,
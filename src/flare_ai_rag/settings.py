@@ -54,6 +54,32 @@ class Settings(BaseSettings):
     )
     telegram_polling_interval: int = 5
 
+    # Embedding cache settings
+    embedding_cache_enabled: bool = True
+    embedding_cache_max_entries: int = 250_000
+
+    # Number of processes parsing source files, 0 uses every core
+    ingestion_workers: int = 0
+    # Memory the contract sources and chunks in flight may take, in MB
+    code_ingestion_memory_mb: int = 512
+    # Seconds the code ingestion is expected to take at most, 0 disables the check
+    code_ingestion_time_budget: int = 0
+    # Export the collections as snapshots after they changed, and restore them
+    # into an empty Qdrant instance at startup
+    index_snapshots: bool = True
+    # Seconds between two polls of the document sources, 0 disables polling
+    source_poll_interval: int = 3600
+    # Number of document sources cloned or pulled concurrently
+    source_sync_workers: int = 4
+    # Seconds after which a git command is aborted and the last checkout is kept
+    source_sync_timeout: int = 300
+    # Index local edits of the checked out sources as soon as they are saved
+    source_watch: bool = False
+    # Seconds without changes after which the locally changed files are indexed
+    source_watch_debounce: float = 2.0
+    # Seconds between two scans of the sources, when watchdog is not installed
+    source_watch_poll_interval: float = 2.0
+
     # Path Settings
     data_path: Path = create_path("data")
     input_path: Path = create_path("flare_ai_rag")
@@ -1,46 +1,159 @@
-import json
+import functools
+import multiprocessing
+import os
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Any
 
-from flare_ai_rag.utils.splitter import data_split
-
-
-def get_code_data(file: Path, overlap: int = 900) -> list[dict]:
-    chunk_size = 10 * overlap
-    with open(file) as f:
-        code = json.load(f)
-
-    r = []
-    for item in code:
-        if len(r) > 500:  # TODO: Remove this
-            break
-        if "SourceCode" not in item:
-            continue
-        content = item["SourceCode"]
-        metadata = {}
-        if "AdditionalSources" in item:
-            metadata["additional_sources"] = [
-                source["Filename"] for source in item["AdditionalSources"]
-            ]
-
-        if "FileName" in item:
-            metadata["file_name"] = item["FileName"]
-        if "Address" in item:
-            metadata["address"] = item["Address"]
-
-        if not metadata.get("file_name"):
-            continue
-        for section in data_split(
-            content,
-            ["\ncontract", "\nfunction", "\nmodifier", "\nevent", "\nstruct"],
-            chunk_size,
-            overlap,
-        ):
-            r.append(
-                {
+from flare_ai_rag.utils.contract_store import ContractSourceStore
+from flare_ai_rag.utils.json_stream import resolve_data_file
+from flare_ai_rag.utils.pipeline import ordered_map
+from flare_ai_rag.utils.progress import ProgressReporter
+from flare_ai_rag.utils.records import ChunkRecord
+from flare_ai_rag.utils.splitter import ChunkingConfig
+
+# Number of contract addresses listed in the metadata of a shared source.
+MAX_ADDRESSES = 10
+# Approximate size of the sources split by one task.
+TASK_BYTES = 1 << 18
+# Splitting runs at about 20 MB/s in one process, so a process pool, whose
+# workers take seconds to start, only pays off for corpora larger than this.
+# See tests/benchmark_code_ingestion.py.
+PARALLEL_MIN_BYTES = 128 << 20
+# The text of a task and its chunks, overlap included, take about this many
+# times the size of its sources in memory.
+TASK_MEMORY_FACTOR = 4
+
+
+@dataclass(frozen=True)
+class CodeIngestionBudget:
+    """
+    Memory and time budget of the code ingestion.
+
+    Attributes:
+        memory_mb: Memory the sources and chunks in flight may take. Bounds the
+            number of tasks pending at a time.
+        seconds: Time the ingestion is expected to take, a warning is logged as
+            soon as it is projected to take longer. 0 disables the check.
+    """
+
+    memory_mb: int = 512
+    seconds: int = 0
+
+    @property
+    def max_pending(self) -> int:
+        return max(1, (self.memory_mb << 20) // (TASK_MEMORY_FACTOR * TASK_BYTES))
+
+
+def get_code_data(
+    file: Path, overlap: int = 900, chunking: ChunkingConfig | None = None
+) -> list[ChunkRecord]:
+    return list(iter_code_data(file, overlap, chunking, workers=1))
+
+
+def _split_blobs(
+    blobs: tuple[tuple[str, Path], ...], chunking: ChunkingConfig
+) -> list[tuple[str, list[str]]]:
+    """Split a group of sources, given as (hash, path) pairs."""
+    return [
+        (digest, chunking.split_solidity(path.read_text(encoding="utf-8")))
+        for digest, path in blobs
+    ]
+
+
+def _tasks(
+    blobs: Iterable[tuple[str, Path, int]],
+) -> Iterator[tuple[tuple[str, Path], ...]]:
+    """Group (hash, path, size) sources into tasks of about TASK_BYTES."""
+    task: list[tuple[str, Path]] = []
+    size = 0
+    for digest, path, blob_size in blobs:
+        task.append((digest, path))
+        size += blob_size
+        if size >= TASK_BYTES:
+            yield tuple(task)
+            task, size = [], 0
+    if task:
+        yield tuple(task)
+
+
+def iter_code_data(  # noqa: PLR0913
+    file: Path,
+    overlap: int = 900,
+    chunking: ChunkingConfig | None = None,
+    store_path: Path | None = None,
+    workers: int | None = None,
+    budget: CodeIngestionBudget | None = None,
+) -> Iterator[ChunkRecord]:
+    """
+    Split the verified contract sources, yielding their chunks one at a time.
+
+    The sources are first collected in a content-addressed store next to the
+    contracts file (or at `store_path`), so every unique source file is split
+    once, however many contracts use it. The contracts file is parsed
+    incrementally. The JSON Lines file written by the downloader is used when
+    it exists, and a gzip or zstd compressed copy when the plain file does not.
+
+    Sources are split in groups on a pool of `workers` processes (all cores by
+    default), unless `workers=1` or the sources are too small to be worth
+    starting the pool for. `budget` bounds the number of
+    groups in flight and sets the time after which the ingestion is reported
+    as over budget. Progress, throughput and the estimated time to completion
+    are logged while the chunks are consumed.
+    """
+    chunking = chunking or ChunkingConfig(overlap=overlap)
+    budget = budget or CodeIngestionBudget()
+    workers = workers or os.cpu_count() or 1
+    contracts_file = resolve_data_file(file)
+    store = ContractSourceStore(store_path or file.with_name("contract_sources"))
+    store.update(contracts_file)
+
+    paths = {digest: store.blob_path(digest) for digest in store.blobs}
+    sizes = {digest: path.stat().st_size for digest, path in paths.items()}
+    blobs = [(digest, path, sizes[digest]) for digest, path in paths.items()]
+    progress = ProgressReporter(
+        "Code ingestion",
+        total=len(blobs),
+        total_bytes=sum(sizes.values()),
+        time_budget=budget.seconds,
+    )
+    split_blobs = functools.partial(_split_blobs, chunking=chunking)
+    if workers == 1 or progress.total_bytes < PARALLEL_MIN_BYTES:
+        results = map(split_blobs, _tasks(blobs))
+        yield from _records(store, results, sizes, progress)
+    else:
+        # Spawn instead of fork, like the source file parsing.
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            results = ordered_map(pool, split_blobs, _tasks(blobs), budget.max_pending)
+            yield from _records(store, results, sizes, progress)
+    progress.finish()
+
+
+def _records(
+    store: ContractSourceStore,
+    results: Iterable[list[tuple[str, list[str]]]],
+    sizes: dict[str, int],
+    progress: ProgressReporter,
+) -> Iterator[ChunkRecord]:
+    for group in results:
+        for digest, sections in group:
+            blob = store.blobs[digest]
+            metadata: dict[str, Any] = {
+                "file_name": blob["file_name"],
+                "blob": digest,
+                "addresses": blob["addresses"][:MAX_ADDRESSES],
+                "num_contracts": len(blob["addresses"]),
+            }
+            for section in sections:
+                yield {
                     "content": section,
-                    "metadata": metadata,
+                    "meta_data": metadata,
                     "file_name": metadata["file_name"],
+                    "source": "contracts",
                     "type": "code",
                 }
-            )
-    return r
+            progress.advance(chunks=len(sections), size=sizes[digest])
@@ -0,0 +1,150 @@
+"""
+Contract Source Store Module
+
+This module keeps a content-addressed store of verified contract sources.
+Every source file, the main `SourceCode` as well as the `AdditionalSources`,
+is stored once under the SHA-256 hash of its text, and every contract address
+maps to the blobs it is built from. Thousands of deployments share the same
+library sources, so the store, and everything indexed from it, grows with the
+number of unique sources rather than with the number of contracts.
+"""
+
+import hashlib
+import json
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any, TypedDict
+
+import structlog
+
+from flare_ai_rag.utils.json_stream import iter_json_items
+
+logger = structlog.get_logger(__name__)
+
+
+class BlobEntry(TypedDict):
+    """
+    A unique source file.
+
+    Attributes:
+        file_name: Path of the source in the first contract that uses it
+        addresses: Addresses of the contracts using the source, in file order
+    """
+
+    file_name: str
+    addresses: list[str]
+
+
+class ContractEntry(TypedDict):
+    """
+    A verified contract.
+
+    Attributes:
+        contract_name: Name of the contract
+        file_name: Path of the contract's main source
+        sources: Blob hash of every source of the contract, by path
+    """
+
+    contract_name: str
+    file_name: str
+    sources: dict[str, str]
+
+
+def _contract_sources(item: dict[str, Any]) -> Iterator[tuple[str, str]]:
+    """Yield the (path, text) pairs of a contract's source files."""
+    if item.get("SourceCode") and item.get("FileName"):
+        yield item["FileName"], item["SourceCode"]
+    for source in item.get("AdditionalSources") or []:
+        if source.get("SourceCode") and source.get("Filename"):
+            yield source["Filename"], source["SourceCode"]
+
+
+class ContractSourceStore:
+    """Content-addressed store of contract sources, backed by a directory."""
+
+    def __init__(self, path: Path) -> None:
+        """
+        Args:
+            path: Directory holding the blobs and the index, created if needed.
+        """
+        self.path = path
+        self.blobs: dict[str, BlobEntry] = {}
+        self.contracts: dict[str, ContractEntry] = {}
+        self._origin: dict[str, int] = {}
+        index = path / "index.json"
+        if index.exists():
+            data = json.loads(index.read_text())
+            self.blobs = data["blobs"]
+            self.contracts = data["contracts"]
+            self._origin = data["origin"]
+
+    def blob_path(self, digest: str) -> Path:
+        return self.path / "blobs" / digest[:2] / digest
+
+    def put(self, text: str) -> str:
+        """Store a source, returning its hash. Known sources are not rewritten."""
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        blob = self.blob_path(digest)
+        if not blob.exists():
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            tmp_blob = blob.with_suffix(".tmp")
+            tmp_blob.write_text(text, encoding="utf-8")
+            tmp_blob.replace(blob)
+        return digest
+
+    def read(self, digest: str) -> str:
+        return self.blob_path(digest).read_text(encoding="utf-8")
+
+    def update(self, contracts_file: Path) -> None:
+        """
+        Index a contracts file, unless it has not changed since the last update.
+
+        Blobs that are no longer used by any contract are left on disk; they
+        are simply not indexed anymore.
+        """
+        stat = contracts_file.stat()
+        origin = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        if origin == self._origin:
+            logger.info("Contract sources are up to date.", path=str(self.path))
+            return
+
+        blobs: dict[str, BlobEntry] = {}
+        contracts: dict[str, ContractEntry] = {}
+        num_sources = 0
+        for item in iter_json_items(contracts_file):
+            address = item.get("Address")
+            if not address:
+                continue
+            sources: dict[str, str] = {}
+            for file_name, text in _contract_sources(item):
+                num_sources += 1
+                digest = self.put(text)
+                sources[file_name] = digest
+                blob = blobs.setdefault(
+                    digest, {"file_name": file_name, "addresses": []}
+                )
+                # Contracts are read one at a time, so a repeated address can
+                # only be the last one.
+                if blob["addresses"][-1:] != [address]:
+                    blob["addresses"].append(address)
+            if sources:
+                contracts[address] = {
+                    "contract_name": item.get("ContractName", ""),
+                    "file_name": item.get("FileName", ""),
+                    "sources": sources,
+                }
+
+        self.blobs, self.contracts, self._origin = blobs, contracts, origin
+        self.path.mkdir(parents=True, exist_ok=True)
+        index = self.path / "index.json"
+        tmp_index = index.with_suffix(".tmp")
+        tmp_index.write_text(
+            json.dumps({"origin": origin, "blobs": blobs, "contracts": contracts})
+        )
+        tmp_index.replace(index)
+        logger.info(
+            "Indexed contract sources.",
+            num_contracts=len(contracts),
+            num_sources=num_sources,
+            num_blobs=len(blobs),
+        )
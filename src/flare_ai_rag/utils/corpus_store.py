@@ -0,0 +1,265 @@
+"""
+Corpus Store Module
+
+This module stores the chunk corpus in a columnar, memory-mappable layout:
+
+- `text.bin`: the UTF-8 text of every chunk, in one contiguous buffer
+- `offsets.bin`: uint64 start offset of every chunk in `text.bin`, plus the end
+- `file_ids.bin`: uint32 index of the file every chunk belongs to
+- `types.bin`: uint8 index of the collection type of every chunk
+- `meta.json`: the per-file name, source and metadata, stored once per file,
+  and the inputs the corpus was parsed from
+
+Opening a store only maps the column files, so loading costs neither time nor
+memory proportional to the corpus; a chunk is decoded when it is accessed.
+A store is replaced by writing a new one next to it and renaming it into place.
+"""
+
+import json
+import mmap
+import shutil
+import sys
+from array import array
+from collections.abc import Collection, Iterable, Iterator, Sequence
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Literal, Self, get_args, override
+
+from flare_ai_rag.utils.records import ChunkRecord, CollectionType
+
+FORMAT_VERSION = 1
+COLLECTION_TYPES: tuple[CollectionType, ...] = get_args(CollectionType)
+# Typecodes of the arrays and memoryviews of the columns.
+type Typecode = Literal["B", "I", "Q"]
+COLUMNS: dict[str, Typecode] = {
+    "offsets.bin": "Q",
+    "file_ids.bin": "I",
+    "types.bin": "B",
+}
+
+
+class CorpusWriter:
+    """Streams chunk records into a new corpus store directory."""
+
+    def __init__(self, path: Path, inputs: dict[str, Any] | None = None) -> None:
+        """
+        Args:
+            path: Directory of the new store.
+            inputs: What the chunks are parsed from, recorded in the store.
+        """
+        self.path = path
+        self.inputs = inputs
+        path.mkdir(parents=True, exist_ok=True)
+        self._text = (path / "text.bin").open("wb")
+        self._offsets = array("Q", [0])
+        self._file_ids = array("I")
+        self._types = array("B")
+        self._files: list[dict[str, Any]] = []
+        self._file_index: dict[tuple[str, str, str], int] = {}
+
+    def add(self, record: ChunkRecord) -> int:
+        """Append a chunk, returning its chunk ID."""
+        meta_data = json.dumps(record["meta_data"], sort_keys=True)
+        key = (record["source"], record["file_name"], meta_data)
+        file_id = self._file_index.get(key)
+        if file_id is None:
+            file_id = self._file_index[key] = len(self._files)
+            self._files.append(
+                {
+                    "file_name": record["file_name"],
+                    "source": record["source"],
+                    "meta_data": record["meta_data"],
+                }
+            )
+        text = record["content"].encode("utf-8")
+        self._text.write(text)
+        self._offsets.append(self._offsets[-1] + len(text))
+        self._file_ids.append(file_id)
+        self._types.append(COLLECTION_TYPES.index(record["type"]))
+        return len(self._file_ids) - 1
+
+    def __len__(self) -> int:
+        return len(self._file_ids)
+
+    def extend(self, records: Iterable[ChunkRecord]) -> None:
+        for record in records:
+            self.add(record)
+
+    def close(self) -> None:
+        """Write the index columns and the file metadata."""
+        self._text.close()
+        for name, column in zip(
+            COLUMNS, (self._offsets, self._file_ids, self._types), strict=True
+        ):
+            with (self.path / name).open("wb") as f:
+                column.tofile(f)
+        meta = {
+            "version": FORMAT_VERSION,
+            "byteorder": sys.byteorder,
+            "num_chunks": len(self._file_ids),
+            "types": COLLECTION_TYPES,
+            "files": self._files,
+            "inputs": self.inputs,
+        }
+        (self.path / "meta.json").write_text(json.dumps(meta))
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self._text.close()
+
+
+class CorpusStore(Sequence[ChunkRecord]):
+    """Read-only, memory-mapped view of a corpus store, indexed by chunk ID."""
+
+    def __init__(self, path: Path) -> None:
+        """
+        Raises:
+            FileNotFoundError: If there is no store at `path`.
+            ValueError: If the store was written in an unsupported format.
+        """
+        self.path = path
+        recover_corpus(path)
+        meta = json.loads((path / "meta.json").read_text())
+        if (
+            meta["version"] != FORMAT_VERSION
+            or meta["byteorder"] != sys.byteorder
+            or tuple(meta["types"]) != COLLECTION_TYPES
+        ):
+            msg = f"Unsupported corpus store format in {path}."
+            raise ValueError(msg)
+        self.files: list[dict[str, Any]] = meta["files"]
+        self.inputs: dict[str, Any] | None = meta.get("inputs")
+        self._num_chunks: int = meta["num_chunks"]
+        self._maps: list[mmap.mmap] = []
+        self._text = self._map("text.bin", "B")
+        self._offsets, self._file_ids, self._types = (
+            self._map(name, typecode) for name, typecode in COLUMNS.items()
+        )
+
+    def _map(self, name: str, typecode: Typecode) -> memoryview:
+        with (self.path / name).open("rb") as f:
+            if not f.seek(0, 2):
+                # Empty files cannot be mapped.
+                return memoryview(b"").cast(typecode)
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mapped)
+        return memoryview(mapped).cast(typecode)
+
+    @override
+    def __len__(self) -> int:
+        return self._num_chunks
+
+    def __getitem__(self, chunk_id: int) -> ChunkRecord:  # type: ignore[override]
+        if not -self._num_chunks <= chunk_id < self._num_chunks:
+            msg = f"Chunk ID {chunk_id} out of range."
+            raise IndexError(msg)
+        chunk_id %= self._num_chunks
+        file = self.files[self._file_ids[chunk_id]]
+        return {
+            "content": self.text(chunk_id),
+            "meta_data": file["meta_data"],
+            "file_name": file["file_name"],
+            "source": file["source"],
+            "type": COLLECTION_TYPES[self._types[chunk_id]],
+        }
+
+    @override
+    def __iter__(self) -> Iterator[ChunkRecord]:
+        for chunk_id in range(self._num_chunks):
+            yield self[chunk_id]
+
+    def select(
+        self,
+        collection_type: CollectionType,
+        file_names: Collection[str] | None = None,
+    ) -> Iterator[ChunkRecord]:
+        """
+        Yield the chunks of a collection type, limited to the chunks of
+        `file_names` if given, only decoding those.
+        """
+        type_id = COLLECTION_TYPES.index(collection_type)
+        file_ids = None
+        if file_names is not None:
+            file_ids = {
+                file_id
+                for file_id, file in enumerate(self.files)
+                if file["file_name"] in file_names
+            }
+        for chunk_id in range(self._num_chunks):
+            if self._types[chunk_id] == type_id and (
+                file_ids is None or self._file_ids[chunk_id] in file_ids
+            ):
+                yield self[chunk_id]
+
+    def text(self, chunk_id: int) -> str:
+        """Decode the text of a single chunk."""
+        start, end = self._offsets[chunk_id], self._offsets[chunk_id + 1]
+        return str(self._text[start:end], "utf-8")
+
+    def close(self) -> None:
+        for view in (self._text, self._offsets, self._file_ids, self._types):
+            view.release()
+        for mapped in self._maps:
+            mapped.close()
+        self._maps.clear()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+
+def recover_corpus(path: Path) -> bool:
+    """
+    Move back the previous store of a write interrupted between its two
+    renames, which left it at `<path>.old` and nothing at `path`.
+
+    Returns:
+        bool: Whether there is a store at `path`.
+    """
+    old_path = path.with_name(path.name + ".old")
+    if not path.exists() and (old_path / "meta.json").exists():
+        old_path.replace(path)
+    return (path / "meta.json").exists()
+
+
+def write_corpus(
+    path: Path, records: Iterable[ChunkRecord], inputs: dict[str, Any] | None = None
+) -> int:
+    """
+    Write a corpus store, replacing the one at `path` once it is complete.
+
+    `records` may be read from the store being replaced. `inputs` describe
+    what the records were parsed from, see CorpusStore.inputs.
+
+    Returns:
+        int: The number of chunks written.
+    """
+    recover_corpus(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    with CorpusWriter(tmp_path, inputs) as writer:
+        writer.extend(records)
+        num_chunks = len(writer)
+    old_path = path.with_name(path.name + ".old")
+    if path.exists():
+        path.replace(old_path)
+    tmp_path.replace(path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    return num_chunks
@@ -1,25 +1,36 @@
-import json
+import functools
+import itertools
+import multiprocessing
+import os
+import traceback
+from collections.abc import Callable, Collection, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
 from pathlib import Path
+from typing import Any
 
 import structlog
-import yaml
 
+from flare_ai_rag.utils.corpus_store import CorpusStore, recover_corpus, write_corpus
+from flare_ai_rag.utils.parsers import ParserStats, format_metadata, get_parser
+from flare_ai_rag.utils.pipeline import ordered_map
+from flare_ai_rag.utils.records import ChunkRecord
 from flare_ai_rag.utils.source_manager import read_settings
-from flare_ai_rag.utils.splitter import data_split
+from flare_ai_rag.utils.splitter import ChunkingConfig
 
 logger = structlog.get_logger(__name__)
 
+# Chunks shorter than this are not worth embedding.
+MIN_CHUNK_CHARS = 30
+# Character chunks at least this long are dropped.
+MAX_CHUNK_CHARS = 20000
 
-def format_metadata(meta_data: dict) -> str:
-    result = ""
-    for key in meta_data:
-        result += f"{str(key).upper()}: {meta_data[key]}\n"
 
-    return "<metadata>\n" + result + "</metadata>\n\n"
-
-
-def metadatadize(func):
-    def wrap_func(*args, **kwargs) -> list[dict]:
+def metadatadize[**P](
+    func: Callable[P, list[ChunkRecord]],
+) -> Callable[P, list[ChunkRecord]]:
+    @functools.wraps(func)
+    def wrap_func(*args: P.args, **kwargs: P.kwargs) -> list[ChunkRecord]:
         output = func(*args, **kwargs)
         for i, data_block in enumerate(output):
             metadata_context = format_metadata(data_block["meta_data"])
@@ -32,112 +43,224 @@ def metadatadize(func):
 
 
 @metadatadize
-def get_data(file: Path, base_path: Path, overlap: int = 900) -> list[dict]:
-    chunk_size = 10 * overlap
-    r = []
-    extension = file.suffix
+def get_data(  # noqa: PLR0913
+    file: Path,
+    base_path: Path,
+    overlap: int = 900,
+    source: str = "",
+    chunking: ChunkingConfig | None = None,
+    stats: dict[str, ParserStats] | None = None,
+) -> list[ChunkRecord]:
+    """
+    Split a file into chunks with the parser registered for its format, see
+    flare_ai_rag.utils.parsers. Every distinct section of the file becomes one
+    chunk. The counts of the parser are added to `stats`, by parser name.
+    """
+    chunking = chunking or ChunkingConfig(overlap=overlap)
+    parser = get_parser(file)
     content = file.read_text()
     file_name = file.relative_to(base_path).as_posix()
     meta_data = {"file_name": file_name}
+    parser_stats = ParserStats(files=1, bytes=file.stat().st_size)
 
-    useful_metadata = ["file_name", "description", "keywords", "tags", "title"]
-
-    if extension in (".mdx", ".md"):
-        if content.startswith("---"):
-            _, mdata, content = content.split("---", 2)
-            meta_data.update(yaml.safe_load(mdata))
-            content = content.strip()
-
-        title = ""
-        if content.startswith("# "):
-            title, content = content.split("\n", 1)
-            content = content.strip()
-            title = title.lstrip("# ")
-            meta_data["title"] = title
-
-        meta_data = {
-            key: value
-            for key, value in meta_data.items()
-            if key.lower() in useful_metadata
-        }
-
-        for section in data_split(
-            content, ["\n# ", "\n## ", "\n### "], chunk_size, overlap
-        ):
-            r.append(
-                {
-                    "content": section,
-                    "meta_data": meta_data,
-                    "file_name": file_name,
-                    "type": "answer",
-                }
-            )
-
-    elif extension in (".js", ".sol", ".py"):
-        seps = {
-            ".js": ["\nfunction", "\nclass", "\nconst", "\nlet", "\nvar"],
-            ".sol": ["\ncontract", "\nfunction", "\nmodifier", "\nevent", "\nstruct"],
-            ".rs": ["\nfn", "\nstruct", "\nimpl", "\nmod"],
-            ".py": ["\ndef", "\nclass"],
-        }
-        for section in data_split(content, seps[extension], chunk_size, overlap):
-            r.append(
-                {
-                    "content": section,
-                    "meta_data": meta_data,
-                    "file_name": file_name,
-                    "type": "code",
-                }
-            )
-
-    else:
-        for section in data_split(content, [], chunk_size, overlap):
-            r.append(
-                {
-                    "content": content,
-                    "meta_data": meta_data,
-                    "file_name": file_name,
-                    "type": "answer",
-                }
-            )
-
-    rr = []
-    for i in r:
-        if len(i["content"]) < 30:
+    r: list[ChunkRecord] = []
+    seen: set[str] = set()
+    for section in parser.parse(content, meta_data, chunking):
+        if len(section) < MIN_CHUNK_CHARS or section in seen:
+            parser_stats.dropped += 1
             continue
-        if len(i["content"]) >= 20000:
-            logger.warning(f"Content too long in file: {i['file_name']}")
+        # Token budgeted chunks are bounded by construction.
+        if chunking.mode == "chars" and len(section) >= MAX_CHUNK_CHARS:
+            logger.warning(f"Content too long in file: {file_name}")
+            parser_stats.dropped += 1
             continue
-        rr.append(i)
-    return rr
+        seen.add(section)
+        r.append(
+            {
+                "content": section,
+                "meta_data": meta_data,
+                "file_name": file_name,
+                "source": source,
+                "type": parser.collection_type,
+            }
+        )
+    parser_stats.chunks = len(r)
+    if stats is not None:
+        stats.setdefault(parser.name, ParserStats()).merge(parser_stats)
+    return r
 
 
-def make_data(data_path: Path) -> None:
-    logger.info("Reading data files...")
-    data = []
+def iter_source_files(data_path: Path) -> Iterator[tuple[str, Path]]:
+    """Discover the files to index, yielding (source name, file path) pairs."""
     settings = read_settings()
     for source in settings:
         source_path = data_path / "files" / source["name"]
         for entry_point in source.get("entry_points", []):
             path = source_path / entry_point
             for incl in source.get("include", []):
-                for file in path.rglob(incl):
-                    if any([file.name.endswith(excl.lstrip("*")) for excl in source.get("exclude", [])]):
+                for file in sorted(path.rglob(incl)):
+                    if any(
+                        [
+                            file.name.endswith(excl.lstrip("*"))
+                            for excl in source.get("exclude", [])
+                        ]
+                    ):
                         continue
                     if not file.is_file():
                         continue
-                    logger.info(f"Reading file: {file.name}")
-                    try:
-                        data.extend(get_data(file, data_path))
-                    except Exception:
-                        logger.exception(
-                            f"Error reading document. filename={file.name}"
-                        )
-                        continue
+                    yield source["name"], file
+
+
+def is_source_file(
+    path: Path, data_path: Path, sources: list[dict] | None = None
+) -> bool:
+    """
+    Whether a path, existing or not, is a file iter_source_files would
+    discover, given the sources settings (read from disk by default).
+    """
+    for source in read_settings() if sources is None else sources:
+        source_path = data_path / "files" / source["name"]
+        for entry_point in source.get("entry_points", []):
+            if not path.is_relative_to(source_path / entry_point):
+                continue
+            if any(
+                path.name.endswith(excl.lstrip("*"))
+                for excl in source.get("exclude", [])
+            ):
+                return False
+            if any(path.match(incl) for incl in source.get("include", [])):
+                return True
+    return False
 
-    with open(data_path / "data.json", "w") as f:
-        json.dump(data, f, indent=2)
-    logger.info("Data written to data.json")
+
+def _read_files(
+    files: tuple[tuple[str, Path], ...],
+    data_path: Path,
+    chunking: ChunkingConfig | None,
+) -> tuple[list[tuple[Path, list[ChunkRecord], str | None]], dict[str, ParserStats]]:
+    """
+    Parse a group of files, capturing per-file failures instead of raising.
+    Also returns the stats of the parsers used.
+    """
+    results: list[tuple[Path, list[ChunkRecord], str | None]] = []
+    stats: dict[str, ParserStats] = {}
+    for source_name, file in files:
+        logger.info(f"Reading file: {file.name}")
+        try:
+            chunks = get_data(
+                file, data_path, source=source_name, chunking=chunking, stats=stats
+            )
+            results.append((file, chunks, None))
+        except Exception:  # noqa: BLE001
+            results.append((file, [], traceback.format_exc()))
+    return results, stats
+
+
+def iter_data(
+    data_path: Path,
+    workers: int | None = None,
+    files_per_task: int = 16,
+    files: Collection[Path] | None = None,
+    chunking: ChunkingConfig | None = None,
+) -> Iterator[ChunkRecord]:
+    """
+    Parse and split the source files, yielding their chunks in file order.
+
+    Files are parsed in groups of `files_per_task` on a pool of `workers`
+    processes (all cores by default); `workers=1` parses in this process.
+    Only a bounded number of groups is in flight at a time, and a file that
+    fails to parse is logged and skipped. If `files` is given, only the source
+    files among them are parsed. `chunking` defaults to character chunks.
+    The files, bytes and chunks of every parser are logged once all files are
+    parsed.
+    """
+    workers = workers or os.cpu_count() or 1
+    source_files = iter_source_files(data_path)
+    if files is not None:
+        wanted = {file.resolve() for file in files}
+        source_files = (item for item in source_files if item[1].resolve() in wanted)
+    tasks = itertools.batched(source_files, files_per_task)
+    read_files = functools.partial(_read_files, data_path=data_path, chunking=chunking)
+    stats: dict[str, ParserStats] = {}
+    if workers == 1:
+        results = map(read_files, tasks)
+        yield from _collect(results, stats)
+    else:
+        # Spawn instead of fork, the parent may already run gRPC and pipeline
+        # threads.
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            yield from _collect(
+                ordered_map(pool, read_files, tasks, 2 * workers), stats
+            )
+    for name, parser_stats in sorted(stats.items()):
+        logger.info("Parser stats.", parser=name, **asdict(parser_stats))
+
+
+def _collect(
+    results: Iterable[
+        tuple[list[tuple[Path, list[ChunkRecord], str | None]], dict[str, ParserStats]]
+    ],
+    stats: dict[str, ParserStats],
+) -> Iterator[ChunkRecord]:
+    for group, group_stats in results:
+        for name, parser_stats in group_stats.items():
+            stats.setdefault(name, ParserStats()).merge(parser_stats)
+        for file, chunks, error in group:
+            if error is not None:
+                logger.error(
+                    f"Error reading document. filename={file.name}", exception=error
+                )
+                continue
+            yield from chunks
+
+
+def file_names(files: Iterable[Path], data_path: Path) -> set[str]:
+    """Map file paths to the `file_name` their chunks are stored under."""
+    return {file.relative_to(data_path).as_posix() for file in files}
+
+
+def make_data(
+    data_path: Path,
+    workers: int | None = None,
+    changed_files: Collection[Path] | None = None,
+    chunking: ChunkingConfig | None = None,
+    inputs: dict[str, Any] | None = None,
+) -> int:
+    """
+    Write the chunks of every source file to the corpus store.
+
+    With `changed_files`, the chunks of all other files are copied over from
+    the existing store and only the changed files are parsed again. `inputs`
+    describe what the corpus is parsed from and are recorded in the store.
+
+    Returns:
+        int: The number of chunks in the store.
+    """
+    output = data_path / "corpus"
+    if changed_files is None or not recover_corpus(output):
+        logger.info("Reading data files...")
+        num_chunks = write_corpus(
+            output, iter_data(data_path, workers, chunking=chunking), inputs
+        )
+    else:
+        logger.info("Updating data files...", num_changed=len(changed_files))
+        changed = file_names(changed_files, data_path)
+        with CorpusStore(output) as store:
+            kept = (chunk for chunk in store if chunk["file_name"] not in changed)
+            num_chunks = write_corpus(
+                output,
+                itertools.chain(
+                    kept,
+                    iter_data(
+                        data_path, workers, files=changed_files, chunking=chunking
+                    ),
+                ),
+                inputs,
+            )
+    logger.info("Data written to the corpus store.", num_chunks=num_chunks)
+    return num_chunks
 
 
 if __name__ == "__main__":
@@ -0,0 +1,166 @@
+"""
+Streaming JSON Module
+
+This module reads large JSON array and JSON Lines files one item at a time, so
+memory use is bounded by the largest item instead of the whole file. Files may
+be stored gzip (".gz") or zstd (".zst") compressed; zstd requires the
+`compression` extra.
+"""
+
+import gzip
+import io
+import json
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any, TextIO
+
+COMPRESSED_SUFFIXES = (".zst", ".gz")
+READ_SIZE = 1 << 16
+
+
+def resolve_data_file(path: Path) -> Path:
+    """
+    Find a data file on disk, falling back to its compressed variants.
+
+    A JSON Lines copy of a JSON file takes precedence, as it is the one kept
+    up to date by the downloaders: `contracts.json` resolves to
+    `contracts.jsonl`, then to `contracts.json` itself, and to a `.zst` or
+    `.gz` compressed copy of either when only that exists.
+    """
+    candidates = [path]
+    if path.suffix == ".json":
+        candidates.insert(0, path.with_suffix(".jsonl"))
+    for candidate in candidates:
+        for suffix in ("", *COMPRESSED_SUFFIXES):
+            compressed = candidate.with_name(candidate.name + suffix)
+            if compressed.exists():
+                return compressed
+    return path
+
+
+def open_text(path: Path) -> TextIO:
+    """Open a text file for reading, decompressing it based on its suffix."""
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8")
+    if path.suffix == ".zst":
+        try:
+            import zstandard  # noqa: PLC0415
+        except ImportError as e:
+            msg = (
+                f"Reading {path.name} requires the 'zstandard' package, "
+                "install the 'compression' extra."
+            )
+            raise ImportError(msg) from e
+        reader = zstandard.ZstdDecompressor().stream_reader(path.open("rb"))
+        return io.TextIOWrapper(reader, encoding="utf-8")
+    return path.open(encoding="utf-8")
+
+
+def is_json_lines(path: Path) -> bool:
+    """Whether a, possibly compressed, data file is in the JSON Lines format."""
+    if path.suffix in COMPRESSED_SUFFIXES:
+        path = path.with_suffix("")
+    return path.suffix == ".jsonl"
+
+
+def iter_json_items(path: Path) -> Iterator[Any]:
+    """Yield the items of a JSON array or JSON Lines file, based on its suffix."""
+    return iter_json_lines(path) if is_json_lines(path) else iter_json_array(path)
+
+
+def iter_json_lines(path: Path) -> Iterator[Any]:
+    """
+    Yield the items of a JSON Lines file one at a time.
+
+    A malformed last line without a line break is the trace of an interrupted
+    append and is skipped.
+
+    Raises:
+        json.JSONDecodeError: If any other line is malformed.
+    """
+    with open_text(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                if line.endswith("\n"):
+                    raise
+
+
+def iter_json_array(path: Path) -> Iterator[Any]:
+    """
+    Yield the items of a top-level JSON array one at a time.
+
+    Raises:
+        ValueError: If the file does not contain a JSON array.
+        json.JSONDecodeError: If an item is malformed or the file is truncated.
+    """
+    decoder = json.JSONDecoder()
+    with open_text(path) as f:
+        buffer = f.read(READ_SIZE).lstrip()
+        if not buffer.startswith("["):
+            msg = f"{path.name} does not contain a JSON array."
+            raise ValueError(msg)
+        pos = 1
+        eof = False
+        while True:
+            # Skip whitespace and the separator in front of the next item.
+            pos = _skip(buffer, pos, " \t\r\n,")
+            if pos < len(buffer) and buffer[pos] == "]":
+                return
+            decoded = _decode_item(decoder, buffer, pos, eof=eof)
+            if decoded is None:
+                buffer, pos, eof = _read_more(f, buffer, pos)
+                continue
+            item, pos = decoded
+            yield item
+
+
+def _skip(buffer: str, pos: int, chars: str) -> int:
+    """The position of the first character from `pos` on that is not in `chars`."""
+    while pos < len(buffer) and buffer[pos] in chars:
+        pos += 1
+    return pos
+
+
+def _decode_item(
+    decoder: json.JSONDecoder, buffer: str, pos: int, *, eof: bool
+) -> tuple[Any, int] | None:
+    """
+    Decode the array item at `pos`, returning it and the position of the
+    separator following it, or None if more of the file has to be read first.
+    """
+    if pos == len(buffer):
+        if eof:
+            msg = "Unterminated array"
+            raise json.JSONDecodeError(msg, buffer, pos)
+        return None
+    try:
+        item, end = decoder.raw_decode(buffer, pos)
+    except json.JSONDecodeError:
+        if eof:
+            raise
+        return None
+    # An item is only complete once the following separator has been read,
+    # otherwise e.g. a number could continue in the next read.
+    delimiter = _skip(buffer, end, " \t\r\n")
+    if delimiter == len(buffer) or buffer[delimiter] not in ",]":
+        if eof:
+            msg = "Expecting ',' delimiter"
+            raise json.JSONDecodeError(msg, buffer, end)
+        return None
+    return item, delimiter
+
+
+def _read_more(f: TextIO, buffer: str, pos: int) -> tuple[str, int, bool]:
+    """
+    Drop the consumed part of the buffer and append the next part of the file.
+
+    The read size grows with the pending data, so an item spanning many reads
+    is not re-decoded over and over.
+    """
+    pending = buffer[pos:]
+    data = f.read(max(READ_SIZE, len(pending)))
+    return pending + data, 0, not data
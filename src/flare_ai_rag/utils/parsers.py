@@ -0,0 +1,201 @@
+"""
+Document Parsers Module
+
+This module holds the registry of the parsers that split source files into
+chunks, keyed by file extension and, for other extensions, by MIME type.
+A parser reads the metadata of a file, e.g. its front matter or title, and
+yields the sections of its content. Files without a parser of their own are
+split as plain text.
+
+A new format is added by registering a parse function:
+
+    @register_parser("toml", "answer", extensions=(".toml",))
+    def parse_toml(content, meta_data, chunking):
+        yield from chunking.split(content, ["\n["], "prose", header_tokens(meta_data))
+
+Parsers run in the ingestion worker processes, so they have to be registered
+when this module, or a module it imports, is imported.
+"""
+
+import itertools
+import mimetypes
+import re
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import yaml
+
+from flare_ai_rag.utils.records import CollectionType
+from flare_ai_rag.utils.splitter import ChunkingConfig, estimate_tokens
+
+# Metadata of markdown files that is kept in their chunks.
+USEFUL_METADATA = ("file_name", "description", "keywords", "tags", "title")
+# A reStructuredText section title: a line underlined, and optionally
+# overlined, by a repeated punctuation character.
+RST_TITLE = re.compile(
+    r"^(?:([=\-`:'\"~^_*+#<>])\1+\n)?(?!\s)[^\n]+\n([=\-`:'\"~^_*+#<>])\2+[ \t]*$",
+    re.MULTILINE,
+)
+
+ParseFunction = Callable[[str, dict[str, Any], ChunkingConfig], Iterator[str]]
+
+
+def format_metadata(meta_data: dict) -> str:
+    result = ""
+    for key, value in meta_data.items():
+        result += f"{str(key).upper()}: {value}\n"
+
+    return "<metadata>\n" + result + "</metadata>\n\n"
+
+
+def header_tokens(meta_data: dict[str, Any]) -> int:
+    """Tokens taken by the metadata header that is prepended to every chunk."""
+    return estimate_tokens(format_metadata(meta_data))
+
+
+@dataclass(frozen=True)
+class Parser:
+    """
+    A registered parser.
+
+    Attributes:
+        name: Name of the format, used in the parser stats.
+        collection_type: Collection the chunks of the format belong to.
+        parse: Function yielding the sections of a file's content. It may
+            update the metadata of the file before yielding the first one.
+    """
+
+    name: str
+    collection_type: CollectionType
+    parse: ParseFunction
+
+
+@dataclass
+class ParserStats:
+    """Number of files, bytes and chunks handled by a parser."""
+
+    files: int = 0
+    bytes: int = 0
+    chunks: int = 0
+    # Chunks dropped for being too short, too long or repeated in a file.
+    dropped: int = 0
+
+    def merge(self, other: "ParserStats") -> None:
+        self.files += other.files
+        self.bytes += other.bytes
+        self.chunks += other.chunks
+        self.dropped += other.dropped
+
+
+# The registered parsers, by lower case file extension and by MIME type.
+BY_EXTENSION: dict[str, Parser] = {}
+BY_MIME_TYPE: dict[str, Parser] = {}
+
+
+def register_parser(
+    name: str,
+    collection_type: CollectionType,
+    extensions: tuple[str, ...] = (),
+    mime_types: tuple[str, ...] = (),
+) -> Callable[[ParseFunction], ParseFunction]:
+    """Register the decorated function as the parser of the given formats."""
+
+    def register(parse: ParseFunction) -> ParseFunction:
+        parser = Parser(name, collection_type, parse)
+        for extension in extensions:
+            BY_EXTENSION[extension] = parser
+        for mime_type in mime_types:
+            BY_MIME_TYPE[mime_type] = parser
+        return parse
+
+    return register
+
+
+def get_parser(file: Path) -> Parser:
+    """The parser of a file: by extension, then by MIME type, then plain text."""
+    parser = BY_EXTENSION.get(file.suffix.lower())
+    if parser is None:
+        mime_type, _ = mimetypes.guess_type(file.name)
+        parser = BY_MIME_TYPE.get(mime_type or "", BY_MIME_TYPE["text/plain"])
+    return parser
+
+
+@register_parser("text", "answer", mime_types=("text/plain",))
+def parse_text(
+    content: str, meta_data: dict[str, Any], chunking: ChunkingConfig
+) -> Iterator[str]:
+    yield from chunking.split(content, [], "prose", header_tokens(meta_data))
+
+
+@register_parser(
+    "markdown", "answer", extensions=(".md", ".mdx"), mime_types=("text/markdown",)
+)
+def parse_markdown(
+    content: str, meta_data: dict[str, Any], chunking: ChunkingConfig
+) -> Iterator[str]:
+    if content.startswith("---"):
+        _, mdata, content = content.split("---", 2)
+        meta_data.update(yaml.safe_load(mdata))
+        content = content.strip()
+
+    if content.startswith("# "):
+        title, content = content.split("\n", 1)
+        content = content.strip()
+        meta_data["title"] = title.lstrip("# ")
+
+    for key in list(meta_data):
+        if key.lower() not in USEFUL_METADATA:
+            del meta_data[key]
+
+    # Leave room for the metadata header that is prepended to every chunk.
+    yield from chunking.split(
+        content, ["\n# ", "\n## ", "\n### "], "prose", header_tokens(meta_data)
+    )
+
+
+@register_parser("rst", "answer", extensions=(".rst",), mime_types=("text/x-rst",))
+def parse_rst(
+    content: str, meta_data: dict[str, Any], chunking: ChunkingConfig
+) -> Iterator[str]:
+    """Split reStructuredText at its section titles, the first being its title."""
+    starts = [match.start() for match in RST_TITLE.finditer(content)]
+    if starts:
+        title = RST_TITLE.match(content, starts[0])
+        if title is not None and not content[: starts[0]].strip():
+            meta_data["title"] = title.group().strip("\n").splitlines()[-2].strip()
+    bounds = [0, *starts, len(content)]
+    sections = (content[start:end] for start, end in itertools.pairwise(bounds))
+    yield from chunking.split_sections(
+        sections, ["\n\n", "\n.. "], "prose", header_tokens(meta_data)
+    )
+
+
+def _code_parser(
+    name: str, extensions: tuple[str, ...], mime_types: tuple[str, ...], seps: list[str]
+) -> None:
+    def parse_code(
+        content: str, meta_data: dict[str, Any], chunking: ChunkingConfig
+    ) -> Iterator[str]:
+        yield from chunking.split(content, seps, "code", header_tokens(meta_data))
+
+    register_parser(name, "code", extensions, mime_types)(parse_code)
+
+
+_code_parser(
+    "javascript",
+    (".js",),
+    ("text/javascript", "application/javascript"),
+    ["\nfunction", "\nclass", "\nconst", "\nlet", "\nvar"],
+)
+_code_parser("python", (".py",), ("text/x-python",), ["\ndef", "\nclass"])
+_code_parser("rust", (".rs",), ("text/rust",), ["\nfn", "\nstruct", "\nimpl", "\nmod"])
+
+
+@register_parser("solidity", "code", extensions=(".sol",))
+def parse_solidity(
+    content: str, meta_data: dict[str, Any], chunking: ChunkingConfig
+) -> Iterator[str]:
+    # Split at contract and function boundaries, without overlap.
+    yield from chunking.split_solidity(content, header_tokens(meta_data))
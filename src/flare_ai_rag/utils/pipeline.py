@@ -0,0 +1,100 @@
+"""
+Pipeline Utilities Module
+
+This module provides the building blocks for streaming, staged processing:
+every stage runs in its own thread and hands its output to the next stage
+through a bounded queue, so a slow consumer applies backpressure instead of
+letting intermediate results pile up in memory.
+"""
+
+import queue
+import threading
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Executor, Future
+from dataclasses import dataclass
+from typing import cast
+
+# How often a blocked producer checks whether the consumer has gone away.
+PUT_TIMEOUT_SECONDS = 0.5
+
+
+@dataclass(frozen=True)
+class _Failure:
+    error: BaseException
+
+
+_DONE = object()
+
+
+def _put(buffer: queue.Queue[object], stopped: threading.Event, item: object) -> bool:
+    """Put an item into the buffer, unless the consumer stopped iterating."""
+    while not stopped.is_set():
+        try:
+            buffer.put(item, timeout=PUT_TIMEOUT_SECONDS)
+        except queue.Full:
+            continue
+        return True
+    return False
+
+
+def _produce(
+    iterable: Iterable[object], buffer: queue.Queue[object], stopped: threading.Event
+) -> None:
+    """Move the items of `iterable`, or its exception, into the buffer."""
+    try:
+        for item in iterable:
+            if not _put(buffer, stopped, item):
+                return
+    except BaseException as e:  # noqa: BLE001
+        _put(buffer, stopped, _Failure(e))
+    finally:
+        _put(buffer, stopped, _DONE)
+
+
+def staged[T](iterable: Iterable[T], maxsize: int, name: str = "stage") -> Iterator[T]:
+    """
+    Consume `iterable` in a background thread, yielding its items in order.
+
+    At most `maxsize` items are buffered between the producer and the consumer.
+    Exceptions raised by the producer are re-raised in the consumer, and the
+    producer stops as soon as the consumer stops iterating.
+    """
+    buffer: queue.Queue[object] = queue.Queue(maxsize=maxsize)
+    stopped = threading.Event()
+    thread = threading.Thread(
+        target=_produce, args=(iterable, buffer, stopped), name=name, daemon=True
+    )
+    thread.start()
+    try:
+        while (item := buffer.get()) is not _DONE:
+            if isinstance(item, _Failure):
+                raise item.error
+            yield cast("T", item)
+    finally:
+        stopped.set()
+
+
+def ordered_map[T, R](
+    executor: Executor,
+    func: Callable[[T], R],
+    jobs: Iterable[T],
+    max_pending: int,
+) -> Iterator[R]:
+    """
+    Run `func` over `jobs` on an executor, yielding results in submission order.
+
+    Jobs are submitted lazily and at most `max_pending` of them are in flight,
+    so neither the inputs nor the results pile up in memory.
+    """
+    pending: deque[Future[R]] = deque()
+    try:
+        for job in jobs:
+            pending.append(executor.submit(func, job))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
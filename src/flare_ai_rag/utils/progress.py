@@ -0,0 +1,191 @@
+"""
+Progress Reporting Module
+
+This module reports the progress of long running ingestion stages: how much of
+the work is done, the throughput so far, the estimated time to completion and
+the peak memory use of the process, logged at a fixed interval. It also counts
+the items passing through each stage of a streaming pipeline, whose stages run
+concurrently, and times the phases of a job.
+"""
+
+import resource
+import sys
+import threading
+import time
+from collections.abc import Generator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any
+
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+# Seconds between two progress reports.
+REPORT_INTERVAL = 10.0
+
+
+def peak_rss_mb(who: int = resource.RUSAGE_SELF) -> float:
+    """Peak resident set size in MB, of this process or of its waited-for children."""
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / (1 << 20 if sys.platform == "darwin" else 1 << 10)
+
+
+class ProgressReporter:
+    """
+    Tracks the items, chunks and bytes processed by a stage and logs its
+    progress every `interval` seconds.
+
+    The estimated time to completion is extrapolated from the share of bytes
+    done when `total_bytes` is known, and from the share of items otherwise.
+    """
+
+    def __init__(
+        self,
+        stage: str,
+        total: int,
+        total_bytes: int = 0,
+        time_budget: float = 0,
+        interval: float = REPORT_INTERVAL,
+    ) -> None:
+        """
+        Args:
+            stage: Name of the stage in the logs.
+            total: Number of items to process.
+            total_bytes: Size of the items to process, 0 if unknown.
+            time_budget: Seconds the stage is expected to take at most, a
+                warning is logged once it is projected to take longer. 0
+                disables the check.
+            interval: Seconds between two progress reports.
+        """
+        self.stage = stage
+        self.total = total
+        self.total_bytes = total_bytes
+        self.time_budget = time_budget
+        self.interval = interval
+        self.items = self.chunks = self.bytes = 0
+        self._start = self._last_report = time.monotonic()
+        self._warned = False
+
+    def advance(self, items: int = 1, chunks: int = 0, size: int = 0) -> None:
+        self.items += items
+        self.chunks += chunks
+        self.bytes += size
+        now = time.monotonic()
+        if now - self._last_report >= self.interval:
+            self._last_report = now
+            self.report()
+
+    def stats(self) -> dict[str, Any]:
+        elapsed = max(time.monotonic() - self._start, 1e-9)
+        if self.total_bytes:
+            done = self.bytes / self.total_bytes
+        else:
+            done = self.items / self.total if self.total else 1.0
+        eta = elapsed * (1 - done) / done if done else None
+        return {
+            "items": self.items,
+            "total": self.total,
+            "percent": round(100 * done, 1),
+            "elapsed_s": round(elapsed, 1),
+            "eta_s": None if eta is None else round(eta, 1),
+            "items_per_s": round(self.items / elapsed, 1),
+            "chunks_per_s": round(self.chunks / elapsed, 1),
+            "mb_per_s": round(self.bytes / elapsed / 1e6, 2),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+        }
+
+    def report(self) -> None:
+        stats = self.stats()
+        logger.info("Ingestion progress.", stage=self.stage, **stats)
+        if (
+            self.time_budget
+            and not self._warned
+            and stats["eta_s"] is not None
+            and stats["elapsed_s"] + stats["eta_s"] > self.time_budget
+        ):
+            self._warned = True
+            logger.warning(
+                "Ingestion is projected to exceed its time budget.",
+                stage=self.stage,
+                time_budget_s=self.time_budget,
+                projected_s=round(stats["elapsed_s"] + stats["eta_s"], 1),
+            )
+
+    def finish(self) -> dict[str, Any]:
+        """Log and return the final statistics of the stage."""
+        stats = self.stats()
+        logger.info("Ingestion done.", stage=self.stage, chunks=self.chunks, **stats)
+        if self.time_budget and stats["elapsed_s"] > self.time_budget:
+            logger.warning(
+                "Ingestion exceeded its time budget.",
+                stage=self.stage,
+                time_budget_s=self.time_budget,
+                elapsed_s=stats["elapsed_s"],
+            )
+        return stats
+
+
+@dataclass
+class _StageStats:
+    count: int = 0
+    busy: float = 0.0
+    first: float = 0.0
+    last: float = 0.0
+
+
+class PipelineMetrics:
+    """
+    Thread-safe counters of the items processed by every stage of a pipeline,
+    and durations of the phases of a job.
+
+    A stage's throughput is its count over the time between its first and its
+    last items. Its busy time adds up the time spent on the items, which is
+    larger than that span when the items are processed by several threads.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stages: dict[str, _StageStats] = {}
+        self._phases: dict[str, float] = {}
+
+    def add(self, stage: str, count: int, busy: float = 0.0) -> None:
+        """Record `count` items processed by a stage in `busy` seconds."""
+        now = time.monotonic()
+        with self._lock:
+            stats = self._stages.get(stage)
+            if stats is None:
+                stats = self._stages[stage] = _StageStats(first=now - busy)
+            stats.count += count
+            stats.busy += busy
+            stats.last = now
+
+    @contextmanager
+    def phase(self, name: str) -> Generator[None]:
+        """Time a phase of the job, adding up repeated phases."""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._phases[name] = (
+                    self._phases.get(name, 0.0) + time.monotonic() - start
+                )
+
+    def stages(self) -> dict[str, dict[str, float]]:
+        with self._lock:
+            return {
+                stage: {
+                    "count": stats.count,
+                    "busy_s": round(stats.busy, 2),
+                    "per_s": round(
+                        stats.count / max(stats.last - stats.first, 1e-9), 1
+                    ),
+                }
+                for stage, stats in self._stages.items()
+            }
+
+    def phases(self) -> dict[str, float]:
+        with self._lock:
+            return {name: round(seconds, 2) for name, seconds in self._phases.items()}
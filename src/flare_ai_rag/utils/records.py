@@ -0,0 +1,29 @@
+"""
+Chunk Record Definitions
+
+This module defines the record type that flows through the ingestion pipeline,
+from the document and contract parsers to the Qdrant collections.
+"""
+
+from typing import Any, Literal, TypedDict
+
+CollectionType = Literal["answer", "code"]
+
+
+class ChunkRecord(TypedDict):
+    """
+    A single chunk of a source document.
+
+    Attributes:
+        content: Text of the chunk, as it is embedded and returned to the responder
+        meta_data: Metadata of the file the chunk was taken from
+        file_name: Name of the file the chunk was taken from
+        source: Name of the source the file belongs to
+        type: Collection the chunk belongs to
+    """
+
+    content: str
+    meta_data: dict[str, Any]
+    file_name: str
+    source: str
+    type: CollectionType
@@ -1,9 +1,14 @@
 import json
+import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Any
 
 import git
 import structlog
 
+from flare_ai_rag.settings import settings
+
 logger = structlog.get_logger(__name__)
 loc = Path(__file__).parent
 data_files = loc.parent.parent / "data" / "files"
@@ -14,26 +19,123 @@ def read_settings():
         return json.load(f)
 
 
-def update_sources() -> list[Path]:
-    changed_files = []
-    for source in read_settings():
-        source_path = data_files / source["name"]
-        branch = source.get("branch", "main")
+def _sparse_checkout(repo: git.Repo, entry_points: list[str], timeout: float) -> None:
+    """Limit the working tree to the entry points, or check out everything."""
+    if entry_points:
+        repo.git.sparse_checkout(
+            "set", "--cone", *entry_points, kill_after_timeout=timeout
+        )
+    else:
+        repo.git.sparse_checkout("disable", kill_after_timeout=timeout)
+
+
+def _clone_source(
+    source: dict[str, Any], source_path: Path, timeout: float
+) -> list[Path]:
+    """
+    Clone the latest commit of a source, fetching the trees of the whole
+    repository but only the files of its entry points.
+    """
+    branch = source.get("branch", "main")
+    entry_points = source.get("entry_points", [])
+    try:
+        git.Git().clone(
+            source["url"],
+            source_path,
+            depth=1,
+            branch=branch,
+            filter="blob:none",
+            no_checkout=True,
+            kill_after_timeout=timeout,
+        )
+        repo = git.Repo(source_path)
+        _sparse_checkout(repo, entry_points, timeout)
+        repo.git.checkout(branch, kill_after_timeout=timeout)
+    except git.GitCommandError:
+        # Do not leave a partial clone behind, the next update starts over.
+        shutil.rmtree(source_path, ignore_errors=True)
+        raise
+    logger.info(f"Cloned {source['name']} from {source['url']}")
+    return [
+        source_path / name
+        for name in repo.git.ls_files("--", *entry_points).splitlines()
+    ]
+
+
+def _pull_source(
+    source: dict[str, Any], source_path: Path, timeout: float
+) -> list[Path]:
+    """
+    Move an existing checkout to the latest commit of its branch, unless it
+    has local changes, which are kept and indexed as they are.
+    """
+    branch = source.get("branch", "main")
+    entry_points = source.get("entry_points", [])
+    repo = git.Repo(source_path)
+    if repo.is_dirty(untracked_files=True):
+        # Resetting the checkout would discard the local edits.
+        logger.warning(
+            "Source has local changes, skipping the pull.", source=source["name"]
+        )
+        return []
+    repo.git.checkout(branch, kill_after_timeout=timeout)
+    _sparse_checkout(repo, entry_points, timeout)
+    repo.git.fetch("origin", branch, depth=1, kill_after_timeout=timeout)
+    # Without rename detection a moved file lists both of its paths.
+    chs = repo.git.diff(
+        "--name-only", "--no-renames", "HEAD", f"origin/{branch}", "--", *entry_points
+    )
+    # A shallow checkout has no history to merge with, it is moved instead.
+    repo.git.reset("--hard", f"origin/{branch}", kill_after_timeout=timeout)
+    if not chs:
+        return []
+    chs = chs.split("\n")
+    logger.info(f"Pulled {source['name']} (Updated {len(chs)} files)")
+    return [source_path / ch for ch in chs]
+
+
+def _update_source(source: dict[str, Any], timeout: float) -> list[Path]:
+    source_path = data_files / source["name"]
+    try:
         if not source_path.exists():
-            repo = git.Repo.clone_from(source["url"], source_path)
-            repo.git.checkout(branch)
-            logger.info(f"Cloned {source['name']} from {source['url']}")
-        else:
-            repo = git.Repo(source_path)
-            repo.git.checkout(branch)
-            repo.remotes.origin.fetch()
-            chs = repo.git.diff("--name-only", f"origin/{branch}")
-            if chs:
-                chs = chs.split("\n")
-                changed_files.extend(chs)
-                repo.remotes.origin.pull()
-                logger.info(f"Pulled {source['name']} (Updated {len(chs)} files)")
-    return changed_files
+            return _clone_source(source, source_path, timeout)
+        return _pull_source(source, source_path, timeout)
+    except git.GitCommandError:
+        # Slow or unreachable remotes must not block indexing; the last
+        # checkout, if any, is indexed as it is.
+        logger.exception(
+            "Failed to update source, keeping the last checkout.",
+            source=source["name"],
+            timeout=timeout,
+        )
+        return []
+
+
+def update_sources(
+    workers: int | None = None, timeout: float | None = None
+) -> list[Path]:
+    """
+    Clone or pull every configured source, several at a time.
+
+    Sources are cloned shallowly, and only their entry points are checked out.
+    A source whose git commands fail or take longer than `timeout` seconds
+    keeps its last checkout.
+
+    Args:
+        workers: Number of sources updated concurrently, defaults to the
+            `source_sync_workers` setting.
+        timeout: Seconds after which a git command is aborted, defaults to the
+            `source_sync_timeout` setting.
+
+    Returns the paths of the files that were added, modified or deleted, every
+    file of a newly cloned source included.
+    """
+    workers = workers or settings.source_sync_workers
+    timeout = timeout or settings.source_sync_timeout
+    sources = read_settings()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(lambda source: _update_source(source, timeout), sources)
+        return [path for changed_files in results for path in changed_files]
 
 
 if __name__ == "__main__":
@@ -1,32 +1,399 @@
+import functools
+import re
+from bisect import bisect_left
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from typing import Any, Literal
+
+ChunkingMode = Literal["chars", "tokens"]
+ContentType = Literal["prose", "code"]
+
+DEFAULT_SEPARATORS = ("\n\n", "\n", " ")
+# Local approximation of a subword tokenizer: words count one token per six
+# characters, and every punctuation character and line break counts as one.
+TOKEN_PATTERN = re.compile(r"\w{1,6}|[^\w\s]|\n")
+SOLIDITY_SEPARATORS = ["\ncontract", "\nfunction", "\nmodifier", "\nevent", "\nstruct"]
+# Braces and semicolons of Solidity code, and the comments and string literals
+# they are to be ignored in.
+SOLIDITY_STRUCTURE = re.compile(
+    r"//[^\n]*|/\*.*?(?:\*/|\Z)"
+    r"""|"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*'"""
+    r"|[{};]",
+    re.DOTALL,
+)
+SOLIDITY_COMMENT = re.compile(r"//[^\n]*|/\*.*?(?:\*/|\Z)", re.DOTALL)
+# Keywords starting the declaration of a contract, interface or library.
+SOLIDITY_DECLARATION = re.compile(
+    r"\b(?:abstract\s+contract|contract|interface|library)\b"
+)
+
+
 def data_split(
     content: str, seps: list[str], chunk_size: int = 10000, overlap: int = 1000
 ) -> list[str]:
     """
     Split the content into chunks of max_chunk_size with overlap. If overlap is too large compared to max_chunk_size
-    then expect wierd results."""
-    assert overlap * 4 <= chunk_size, "Overlap is too large compared to max_chunk_size"
+    then expect wierd results.
+
+    Cut points are only searched for in bounded windows around the chunk
+    boundaries, so every chunk scans at most len(seps) windows of 2 * overlap
+    characters and splitting runs in linear time. See tests/benchmark_splitter.py.
+    """
+    if overlap * 4 > chunk_size:
+        msg = "Overlap is too large compared to max_chunk_size"
+        raise ValueError(msg)
     r = []
-    seps = seps + ["\n\n", "\n", " "]
+    seps = [*seps, *DEFAULT_SEPARATORS]
+    find = content.find
+    size = len(content)
+    reach = overlap // 4
     i = 0
-    while len(content) - i > chunk_size:
-        j = -1
+    while size - i > chunk_size:
+        # Cut at the first separator, in priority order, before the chunk ends.
+        end = i + chunk_size
         for sep in seps:
-            j = content.find(sep, i + chunk_size - 2 * overlap, i + chunk_size)
+            j = find(sep, end - 2 * overlap, end)
             if j != -1:
                 break
-        if j == -1:
-            j = i + chunk_size - overlap
+        else:
+            j = end - overlap
         r.append(content[i:j].strip())
 
+        # Start the next chunk at a separator around `overlap` before the cut.
         ii = j - overlap
-        jj = -1
         for sep in seps:
-            jj = content.find(sep, ii - overlap // 4, ii + overlap // 4)
-            if jj != -1:
+            i = find(sep, ii - reach, ii + reach)
+            if i != -1:
                 break
-        if jj == -1:
+        else:
             i = ii
+    r.append(content[i:].strip())
+    return r
+
+
+def _count_tokens(text: str) -> int:
+    return len(TOKEN_PATTERN.findall(text))
+
+
+@functools.lru_cache(maxsize=65536)
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens of a text, without calling a tokenizer."""
+    return _count_tokens(text)
+
+
+def token_split(
+    content: str, seps: list[str], chunk_tokens: int = 512, overlap: int = 64
+) -> list[str]:
+    """
+    Split the content like data_split, but measure chunks in estimated tokens.
+
+    No chunk holds more than `chunk_tokens` tokens, and consecutive chunks
+    overlap by about `overlap` tokens. Cut points are chosen at the same
+    separators, in the same order of priority, as in data_split.
+    """
+    if overlap * 4 > chunk_tokens:
+        msg = "Overlap is too large compared to chunk_tokens"
+        raise ValueError(msg)
+    starts = [match.start() for match in TOKEN_PATTERN.finditer(content)]
+    num_tokens = len(starts)
+
+    def position(token: int) -> int:
+        return starts[token] if token < num_tokens else len(content)
+
+    r = []
+    seps = [*seps, *DEFAULT_SEPARATORS]
+    find = content.find
+    reach = overlap // 4
+    i = t = 0
+    while num_tokens - t > chunk_tokens:
+        end = t + chunk_tokens
+        for sep in seps:
+            j = find(sep, position(end - 2 * overlap), position(end))
+            if j != -1:
+                break
+        else:
+            j = position(end - overlap)
+        r.append(content[i:j].strip())
+
+        back = bisect_left(starts, j) - overlap
+        for sep in seps:
+            i = find(sep, position(back - reach), position(back + reach))
+            if i != -1:
+                break
         else:
-            i = jj
+            i = position(back)
+        t = bisect_left(starts, i)
     r.append(content[i:].strip())
     return r
+
+
+def _solidity_structure(content: str) -> list[tuple[int, str, int]]:
+    """
+    List the braces and semicolons of Solidity code that are not in comments
+    or strings, as (position, character, brace depth before it) triples.
+    """
+    events = []
+    depth = 0
+    for match in SOLIDITY_STRUCTURE.finditer(content):
+        char = match.group()
+        if len(char) > 1:
+            continue
+        events.append((match.start(), char, depth))
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth = max(depth - 1, 0)
+    return events
+
+
+def _solidity_units(
+    events: list[tuple[int, str, int]], depth: int, start: int, end: int
+) -> list[tuple[int, int]]:
+    """
+    Split the code between `start` and `end`, whose structure is given by
+    `events`, into the statements and blocks at the given brace depth, as
+    (start, end) spans. Every span begins right after the previous one, so
+    comments stay with the code that follows them.
+    """
+    spans = []
+    for pos, char, before in events:
+        if (char == ";" and before == depth) or (char == "}" and before == depth + 1):
+            spans.append((start, pos + 1))
+            start = pos + 1
+    if start < end:
+        spans.append((start, end))
+    return spans
+
+
+def _pack(pieces: Iterable[tuple[str, int]], budget: int) -> list[tuple[str, int]]:
+    """
+    Join consecutive (text, size) pieces into chunks of up to `budget`.
+
+    Pieces cut from the content one after the other are joined as they are.
+    Pieces that were split or wrapped on their own lost the whitespace around
+    them, so they are joined on a new line instead of being glued together.
+    """
+    chunks: list[tuple[str, int]] = []
+    current: list[str] = []
+    size = 0
+    for piece, piece_size in pieces:
+        if current and size + piece_size > budget:
+            chunks.append(("".join(current), size))
+            current, size = [], 0
+        if current and not (current[-1][-1:].isspace() or piece[:1].isspace()):
+            current.append("\n")
+        current.append(piece)
+        size += piece_size
+    if current:
+        chunks.append(("".join(current), size))
+    return chunks
+
+
+def _wrap(
+    members: list[tuple[str, int]],
+    budget: int,
+    header: str,
+    footer: str,
+    wrapper_size: int,
+) -> list[tuple[str, int]]:
+    """Pack members of a contract into chunks, each wrapped in its declaration."""
+    # Members are cut from the contract one after the other, so they keep the
+    # whitespace between them.
+    return [
+        (f"{header}{text.lstrip('\n').rstrip()}{footer}", size + wrapper_size)
+        for text, size in _pack(members, budget)
+    ]
+
+
+def _declaration_start(content: str, start: int, end: int) -> int:
+    """
+    Position of the contract, interface or library keyword between `start` and
+    `end`, skipping the comments in front of it, or `start` if there is none.
+    """
+    comments = [
+        match.span() for match in SOLIDITY_COMMENT.finditer(content, start, end)
+    ]
+    for match in SOLIDITY_DECLARATION.finditer(content, start, end):
+        if not any(first <= match.start() < last for first, last in comments):
+            return match.start()
+    return start
+
+
+def solidity_split(
+    content: str,
+    budget: int,
+    measure: Callable[[str], int] = len,
+    fallback: Callable[[str], list[str]] | None = None,
+) -> list[str]:
+    """
+    Split Solidity code into chunks of whole contracts, functions, modifiers,
+    events and other declarations, without overlap.
+
+    Top-level declarations are packed into chunks of up to `budget`, as
+    measured by `measure`. A contract that does not fit is split into its
+    members instead, and every chunk of it starts with the contract's
+    declaration, so it still reads as part of that contract. The comments in
+    front of the declaration, e.g. its NatSpec, only start its first chunk.
+    Braces in comments and string literals are ignored. A single member that
+    does not fit either is split by `fallback`, by default data_split at
+    SOLIDITY_SEPARATORS, into chunks of its own.
+    """
+    if fallback is None:
+        fallback = functools.partial(
+            data_split,
+            seps=SOLIDITY_SEPARATORS,
+            chunk_size=budget,
+            overlap=budget // 10,
+        )
+    events = _solidity_structure(content)
+    positions = [pos for pos, _, _ in events]
+    pieces: list[tuple[str, int]] = []
+    for start, end in _solidity_units(events, 0, 0, len(content)):
+        unit = content[start:end]
+        size = measure(unit)
+        if size <= budget:
+            pieces.append((unit, size))
+            continue
+        first = bisect_left(positions, start)
+        if first == len(events) or events[first][0] >= end or events[first][1] != "{":
+            pieces.extend((section, budget) for section in fallback(unit))
+            continue
+        body = events[first][0]
+        close = end - 1 if content[end - 1] == "}" else end
+        declaration = _declaration_start(content, start, body)
+        # Comments and whitespace in front of the declaration.
+        preamble = content[start:declaration]
+        if preamble.strip():
+            pieces.append((preamble, measure(preamble)))
+        header, footer = content[declaration : body + 1].strip() + "\n", "\n}"
+        wrapper_size = measure(header) + measure(footer)
+        if wrapper_size > budget // 2:
+            # Not worth repeating in every chunk of the contract.
+            header, footer, wrapper_size = "", "", 0
+        wrap = functools.partial(
+            _wrap,
+            budget=budget - wrapper_size,
+            header=header,
+            footer=footer,
+            wrapper_size=wrapper_size,
+        )
+        members: list[tuple[str, int]] = []
+        unit_events = events[first + 1 : bisect_left(positions, close)]
+        for member_start, member_end in _solidity_units(
+            unit_events, 1, body + 1, close
+        ):
+            member = content[member_start:member_end]
+            size = measure(member)
+            if size <= budget - wrapper_size:
+                members.append((member, size))
+                continue
+            pieces.extend(wrap(members))
+            members = []
+            pieces.extend((section, budget) for section in fallback(member))
+        pieces.extend(wrap(members))
+    chunks = (text.strip() for text, _ in _pack(pieces, budget))
+    return [chunk for chunk in chunks if chunk]
+
+
+@dataclass(frozen=True)
+class ChunkingConfig:
+    """
+    Configuration of how documents are split into chunks.
+
+    In "chars" mode chunks hold up to 10 * overlap characters. In "tokens" mode
+    chunks are budgeted in estimated tokens, separately for prose and code.
+    """
+
+    mode: ChunkingMode = "chars"
+    overlap: int = 900
+    prose_tokens: int = 512
+    prose_overlap_tokens: int = 64
+    code_tokens: int = 768
+    code_overlap_tokens: int = 96
+
+    @staticmethod
+    def load(chunking_config: dict[str, Any]) -> "ChunkingConfig":
+        return ChunkingConfig(
+            mode=chunking_config.get("mode", "chars"),
+            overlap=chunking_config.get("overlap", 900),
+            prose_tokens=chunking_config.get("prose_tokens", 512),
+            prose_overlap_tokens=chunking_config.get("prose_overlap_tokens", 64),
+            code_tokens=chunking_config.get("code_tokens", 768),
+            code_overlap_tokens=chunking_config.get("code_overlap_tokens", 96),
+        )
+
+    def split(
+        self,
+        content: str,
+        seps: list[str],
+        content_type: ContentType,
+        reserved_tokens: int = 0,
+    ) -> list[str]:
+        """
+        Split content of the given type into chunks.
+
+        `reserved_tokens` is taken off the token budget of every chunk, e.g. for
+        a header that is prepended to the chunks afterwards.
+        """
+        if self.mode == "chars":
+            return data_split(content, seps, 10 * self.overlap, self.overlap)
+        if content_type == "code":
+            chunk_tokens, overlap = self.code_tokens, self.code_overlap_tokens
+        else:
+            chunk_tokens, overlap = self.prose_tokens, self.prose_overlap_tokens
+        chunk_tokens = max(chunk_tokens - reserved_tokens, 4 * overlap)
+        return token_split(content, seps, chunk_tokens, overlap)
+
+    def _budget(
+        self, content_type: ContentType, reserved_tokens: int
+    ) -> tuple[int, Callable[[str], int]]:
+        """The chunk size of content of the given type, and how to measure it."""
+        if self.mode == "chars":
+            return 10 * self.overlap, len
+        if content_type == "code":
+            chunk_tokens, overlap = self.code_tokens, self.code_overlap_tokens
+        else:
+            chunk_tokens, overlap = self.prose_tokens, self.prose_overlap_tokens
+        # Not cached like estimate_tokens, as most of the measured text is only
+        # measured once.
+        return max(chunk_tokens - reserved_tokens, 4 * overlap), _count_tokens
+
+    def split_sections(
+        self,
+        sections: Iterable[str],
+        seps: list[str],
+        content_type: ContentType,
+        reserved_tokens: int = 0,
+    ) -> list[str]:
+        """
+        Pack consecutive sections of a document into chunks, without overlap.
+        Sections that are too large on their own are split by `split`.
+        """
+        budget, measure = self._budget(content_type, reserved_tokens)
+        pieces: list[tuple[str, int]] = []
+        for section in sections:
+            size = measure(section)
+            if size <= budget:
+                pieces.append((section, size))
+            else:
+                pieces.extend(
+                    (chunk, budget)
+                    for chunk in self.split(
+                        section, seps, content_type, reserved_tokens
+                    )
+                )
+        chunks = (text.strip() for text, _ in _pack(pieces, budget))
+        return [chunk for chunk in chunks if chunk]
+
+    def split_solidity(self, content: str, reserved_tokens: int = 0) -> list[str]:
+        """
+        Split Solidity code at contract and function boundaries, see
+        solidity_split, with the chunk size of code in the configured mode.
+        Declarations that are too large on their own are split by `split`.
+        """
+
+        def fallback(code: str) -> list[str]:
+            return self.split(code, SOLIDITY_SEPARATORS, "code", reserved_tokens)
+
+        budget, measure = self._budget("code", reserved_tokens)
+        return solidity_split(content, budget, measure, fallback)
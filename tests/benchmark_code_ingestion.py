@@ -0,0 +1,70 @@
+"""
+Benchmark of the code ingestion over the full verified contract corpus.
+
+Builds a fresh contract source store from the contracts file, then splits every
+unique source into chunks and reports the throughput in chunks/s and MB/s as
+well as the peak RSS of this process and of the splitting workers. Run it once
+per configuration, as the peak RSS of a process only grows:
+
+    python tests/benchmark_code_ingestion.py --workers 1
+    python tests/benchmark_code_ingestion.py --workers 8 --memory-mb 256
+"""
+
+import argparse
+import resource
+import tempfile
+import time
+from pathlib import Path
+
+import structlog
+
+from flare_ai_rag.settings import settings
+from flare_ai_rag.utils.code_data_reader import CodeIngestionBudget, iter_code_data
+from flare_ai_rag.utils.contract_store import ContractSourceStore
+from flare_ai_rag.utils.json_stream import resolve_data_file
+from flare_ai_rag.utils.progress import peak_rss_mb
+
+logger = structlog.get_logger(__name__)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--memory-mb", type=int, default=512)
+    args = parser.parse_args()
+
+    contracts = resolve_data_file(settings.data_path / "contracts.json")
+    with tempfile.TemporaryDirectory() as tmp:
+        store_path = Path(tmp) / "contract_sources"
+        start = time.perf_counter()
+        ContractSourceStore(store_path).update(contracts)
+        store_seconds = time.perf_counter() - start
+        logger.info("Built the contract source store.", seconds=round(store_seconds, 3))
+
+        num_chunks = size = 0
+        start = time.perf_counter()
+        for chunk in iter_code_data(
+            contracts,
+            store_path=store_path,
+            workers=args.workers or None,
+            budget=CodeIngestionBudget(memory_mb=args.memory_mb),
+        ):
+            num_chunks += 1
+            size += len(chunk["content"].encode("utf-8"))
+        seconds = time.perf_counter() - start
+
+    logger.info(
+        "Code ingestion throughput.",
+        workers=args.workers or "all",
+        memory_mb=args.memory_mb,
+        num_chunks=num_chunks,
+        seconds=round(seconds, 3),
+        chunks_per_s=round(num_chunks / seconds),
+        chunk_mb_per_s=round(size / seconds / 1e6, 1),
+        peak_rss_mb=round(peak_rss_mb(), 1),
+        peak_worker_rss_mb=round(peak_rss_mb(resource.RUSAGE_CHILDREN), 1),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Micro-benchmark of data_split over the real corpus.
+
+Splits the checked out documentation sources and the verified contract sources
+with the current splitter and the original one, checks that both produce the
+same chunks and reports their throughput in MB/s and chunks/s.
+"""
+
+import time
+from collections.abc import Callable, Iterator
+
+import structlog
+
+from flare_ai_rag.settings import settings
+from flare_ai_rag.utils.data_maker import iter_source_files
+from flare_ai_rag.utils.json_stream import iter_json_items, resolve_data_file
+from flare_ai_rag.utils.splitter import data_split
+
+logger = structlog.get_logger(__name__)
+
+OVERLAP = 900
+CHUNK_SIZE = 10 * OVERLAP
+SEPARATORS = {
+    ".md": ["\n# ", "\n## ", "\n### "],
+    ".mdx": ["\n# ", "\n## ", "\n### "],
+    ".js": ["\nfunction", "\nclass", "\nconst", "\nlet", "\nvar"],
+    ".sol": ["\ncontract", "\nfunction", "\nmodifier", "\nevent", "\nstruct"],
+    ".py": ["\ndef", "\nclass"],
+}
+CONTRACT_SEPARATORS = ["\ncontract", "\nfunction", "\nmodifier", "\nevent", "\nstruct"]
+REPEATS = 3
+
+
+def reference_split(
+    content: str, seps: list[str], chunk_size: int = 10000, overlap: int = 1000
+) -> list[str]:
+    """The original data_split, rescanning every window for every separator."""
+    r = []
+    seps = seps + ["\n\n", "\n", " "]
+    i = 0
+    while len(content) - i > chunk_size:
+        j = -1
+        for sep in seps:
+            j = content.find(sep, i + chunk_size - 2 * overlap, i + chunk_size)
+            if j != -1:
+                break
+        if j == -1:
+            j = i + chunk_size - overlap
+        r.append(content[i:j].strip())
+
+        ii = j - overlap
+        jj = -1
+        for sep in seps:
+            jj = content.find(sep, ii - overlap // 4, ii + overlap // 4)
+            if jj != -1:
+                break
+        i = ii if jj == -1 else jj
+    r.append(content[i:].strip())
+    return r
+
+
+def load_documents() -> Iterator[tuple[str, str, list[str]]]:
+    """Yield (name, content, separators) for every file of the corpus."""
+    for _, file in iter_source_files(settings.data_path):
+        if file.suffix in SEPARATORS:
+            yield file.name, file.read_text(), SEPARATORS[file.suffix]
+    contracts = resolve_data_file(settings.data_path / "contracts.json")
+    if contracts.exists():
+        for item in iter_json_items(contracts):
+            if "SourceCode" in item:
+                yield item.get("FileName", ""), item["SourceCode"], CONTRACT_SEPARATORS
+
+
+def measure(
+    split: Callable[[str, list[str], int, int], list[str]],
+    documents: list[tuple[str, str, list[str]]],
+) -> tuple[float, int]:
+    """Return the best time over REPEATS runs and the number of chunks."""
+    best = float("inf")
+    num_chunks = 0
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        num_chunks = sum(
+            len(split(content, seps, CHUNK_SIZE, OVERLAP))
+            for _, content, seps in documents
+        )
+        best = min(best, time.perf_counter() - start)
+    return best, num_chunks
+
+
+def main() -> None:
+    documents = list(load_documents())
+    size_mb = sum(len(content.encode("utf-8")) for _, content, _ in documents) / 1e6
+    logger.info("Loaded corpus.", num_documents=len(documents), size_mb=size_mb)
+
+    for name, content, seps in documents:
+        expected = reference_split(content, seps, CHUNK_SIZE, OVERLAP)
+        if data_split(content, seps, CHUNK_SIZE, OVERLAP) != expected:
+            logger.error("Splitter output differs.", document=name)
+            return
+
+    for label, split in (("reference", reference_split), ("data_split", data_split)):
+        seconds, num_chunks = measure(split, documents)
+        logger.info(
+            "Splitter throughput.",
+            splitter=label,
+            seconds=round(seconds, 3),
+            mb_per_s=round(size_mb / seconds, 1),
+            chunks_per_s=round(num_chunks / seconds),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from flare_ai_rag.utils.code_data_reader import iter_code_data
+from flare_ai_rag.utils.contract_store import ContractSourceStore
+
+LIBRARY = "library SafeMath {\n    function add(uint a, uint b) internal {}\n}\n"
+
+
+def contract(address: str, body: str) -> dict[str, Any]:
+    return {
+        "Address": address,
+        "ContractName": "Token",
+        "FileName": "contracts/Token.sol",
+        "SourceCode": f"contract Token {{\n    {body}\n}}\n",
+        "AdditionalSources": [
+            {"Filename": "lib/SafeMath.sol", "SourceCode": LIBRARY},
+        ],
+    }
+
+
+def write_contracts(path: Path, *contracts: dict[str, Any]) -> None:
+    path.write_text(json.dumps(list(contracts)))
+
+
+@pytest.fixture
+def contracts_file(tmp_path: Path) -> Path:
+    path = tmp_path / "contracts.json"
+    write_contracts(
+        path,
+        contract("0x1", "function mint() public {}"),
+        contract("0x2", "function burn() public {}"),
+    )
+    return path
+
+
+def test_shared_sources_are_stored_once(tmp_path: Path, contracts_file: Path) -> None:
+    store = ContractSourceStore(tmp_path / "store")
+    store.update(contracts_file)
+    # Two main sources and the library they share.
+    assert len(store.blobs) == len(store.contracts) + 1
+    library = store.contracts["0x1"]["sources"]["lib/SafeMath.sol"]
+    assert store.contracts["0x2"]["sources"]["lib/SafeMath.sol"] == library
+    assert store.blobs[library]["addresses"] == ["0x1", "0x2"]
+    assert store.read(library) == LIBRARY
+
+
+def test_store_is_rebuilt_when_contracts_change(
+    tmp_path: Path, contracts_file: Path
+) -> None:
+    store = ContractSourceStore(tmp_path / "store")
+    store.update(contracts_file)
+    write_contracts(contracts_file, contract("0x3", "function pause() external {}"))
+    store.update(contracts_file)
+    assert set(store.contracts) == {"0x3"}
+    assert set(store.blobs) == set(store.contracts["0x3"]["sources"].values())
+    # The index on disk is rebuilt too.
+    assert set(ContractSourceStore(tmp_path / "store").contracts) == {"0x3"}
+
+
+def test_unchanged_contracts_are_not_indexed_again(
+    tmp_path: Path, contracts_file: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    ContractSourceStore(tmp_path / "store").update(contracts_file)
+    store = ContractSourceStore(tmp_path / "store")
+    monkeypatch.setattr(store, "put", pytest.fail)
+    store.update(contracts_file)
+    assert set(store.contracts) == {"0x1", "0x2"}
+
+
+def test_touched_contracts_are_indexed_again(
+    tmp_path: Path, contracts_file: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    store = ContractSourceStore(tmp_path / "store")
+    store.update(contracts_file)
+    stored: list[str] = []
+    put = store.put
+
+    def record_put(text: str) -> str:
+        stored.append(text)
+        return put(text)
+
+    monkeypatch.setattr(store, "put", record_put)
+    stat = contracts_file.stat()
+    os.utime(contracts_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    store.update(contracts_file)
+    assert LIBRARY in stored
+
+
+def test_code_data_follows_the_contracts(tmp_path: Path, contracts_file: Path) -> None:
+    def contents() -> str:
+        records = iter_code_data(contracts_file, workers=1)
+        return "".join(record["content"] for record in records)
+
+    assert "mint" in contents()
+    write_contracts(contracts_file, contract("0x3", "function pause() external {}"))
+    text = contents()
+    assert "pause" in text
+    assert "mint" not in text
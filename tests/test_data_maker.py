@@ -0,0 +1,36 @@
+from pathlib import Path
+
+import pytest
+
+from flare_ai_rag.utils import data_maker
+from flare_ai_rag.utils.data_maker import iter_data
+
+SOURCES = [{"name": "docs", "entry_points": ["."], "include": ["*.md"]}]
+BODY = "Some text that is long enough to be kept as a chunk of its own.\n"
+
+
+@pytest.fixture
+def data_path(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setattr(data_maker, "read_settings", lambda: SOURCES)
+    docs = tmp_path / "files" / "docs"
+    docs.mkdir(parents=True)
+    (docs / "a.md").write_text(f"# A\n\n{BODY}")
+    # Not UTF-8, reading it fails.
+    (docs / "b.md").write_bytes(b"# B\n\n\xff\xfe" + BODY.encode())
+    (docs / "c.md").write_text(f"# C\n\n{BODY}")
+    return tmp_path
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_file_that_fails_to_parse_is_skipped(data_path: Path, workers: int) -> None:
+    records = list(iter_data(data_path, workers=workers, files_per_task=2))
+    assert {record["file_name"] for record in records} == {
+        "files/docs/a.md",
+        "files/docs/c.md",
+    }
+
+
+def test_only_given_files_are_parsed(data_path: Path) -> None:
+    files = [data_path / "files" / "docs" / "c.md", data_path / "notes.txt"]
+    records = list(iter_data(data_path, workers=1, files=files))
+    assert {record["file_name"] for record in records} == {"files/docs/c.md"}
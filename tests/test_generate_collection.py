@@ -1,4 +1,3 @@
-import pandas as pd
 import structlog
 from qdrant_client import QdrantClient
 
@@ -7,6 +6,7 @@ from flare_ai_rag.retriever.config import RetrieverConfig
 from flare_ai_rag.retriever.qdrant_collection import generate_collection
 from flare_ai_rag.settings import settings
 from flare_ai_rag.utils import load_json
+from flare_ai_rag.utils.data_maker import iter_data
 
 logger = structlog.get_logger(__name__)
 
@@ -16,9 +16,8 @@ def main() -> None:
     config_json = load_json(settings.input_path / "input_parameters.json")
     retriever_config = RetrieverConfig.load(config_json["retriever_config"])
 
-    # Load the CSV file.
-    df_docs = pd.read_csv(settings.data_path / "docs.csv", delimiter=",")
-    logger.info("Loaded CSV Data.", num_rows=len(df_docs))
+    # Stream the chunked documents.
+    records = iter_data(settings.data_path)
 
     # Initialize Qdrant client.
     client = QdrantClient(host=retriever_config.host, port=retriever_config.port)
@@ -27,10 +26,11 @@ def main() -> None:
     embedding_client = GeminiEmbedding(api_key=settings.gemini_api_key)
 
     generate_collection(
-        df_docs,
+        records,
         client,
         retriever_config,
         embedding_client=embedding_client,
+        collection_type="answer",
     )
 
 
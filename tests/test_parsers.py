@@ -0,0 +1,62 @@
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from flare_ai_rag.utils import parsers
+from flare_ai_rag.utils.parsers import get_parser, parse_rst
+from flare_ai_rag.utils.splitter import ChunkingConfig
+
+
+@pytest.mark.parametrize(
+    ("file_name", "parser"),
+    [
+        # By extension, whatever the case.
+        ("guide.md", "markdown"),
+        ("guide.MDX", "markdown"),
+        ("Token.sol", "solidity"),
+        ("index.rst", "rst"),
+        # By MIME type.
+        ("notes.markdown", "markdown"),
+        ("module.mjs", "javascript"),
+        ("notes.text", "text"),
+        # Plain text otherwise.
+        ("notes.txt", "text"),
+        ("Makefile", "text"),
+        ("data.unknown", "text"),
+    ],
+)
+def test_parser_lookup(file_name: str, parser: str) -> None:
+    assert get_parser(Path(file_name)).name == parser
+
+
+def test_extension_takes_precedence_over_mime_type(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    markdown = get_parser(Path("guide.md"))
+    monkeypatch.setitem(parsers.BY_EXTENSION, ".mjs", markdown)
+    assert get_parser(Path("module.mjs")) is markdown
+
+
+def parse(content: str) -> tuple[list[str], dict[str, Any]]:
+    meta_data: dict[str, Any] = {"file_name": "index.rst"}
+    sections = list(parse_rst(content, meta_data, ChunkingConfig()))
+    return sections, meta_data
+
+
+def test_rst_title_is_the_first_section_title() -> None:
+    sections, meta_data = parse(
+        "Getting Started\n===============\n\nIntro.\n\nInstall\n-------\n\nRun it.\n"
+    )
+    assert meta_data["title"] == "Getting Started"
+    assert any("Install\n-------" in section for section in sections)
+
+
+def test_rst_overlined_title() -> None:
+    _, meta_data = parse("=======\nOverview\n=======\n\nText.\n")
+    assert meta_data["title"] == "Overview"
+
+
+def test_rst_without_leading_title() -> None:
+    _, meta_data = parse("Some text first.\n\nLater\n-----\n\nMore text.\n")
+    assert "title" not in meta_data
@@ -0,0 +1,67 @@
+import threading
+import time
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from flare_ai_rag.utils.pipeline import ordered_map, staged
+
+MAX_PENDING = 2
+FAILING_JOB = 2
+
+
+def test_ordered_map_yields_in_submission_order() -> None:
+    def slow(delay: float) -> float:
+        time.sleep(delay)
+        return delay
+
+    delays = [0.05, 0.0, 0.03, 0.01, 0.0, 0.02]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        assert list(ordered_map(executor, slow, delays, max_pending=3)) == delays
+
+
+def test_ordered_map_bounds_pending_jobs() -> None:
+    lock = threading.Lock()
+    running = peak = 0
+
+    def track(job: int) -> int:
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.01)
+        with lock:
+            running -= 1
+        return job
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(ordered_map(executor, track, range(20), max_pending=MAX_PENDING))
+    assert results == list(range(20))
+    assert peak <= MAX_PENDING
+
+
+def test_ordered_map_reraises_job_errors() -> None:
+    def fail(job: int) -> int:
+        if job == FAILING_JOB:
+            msg = "job failed"
+            raise ValueError(msg)
+        return job
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = ordered_map(executor, fail, range(5), max_pending=MAX_PENDING)
+        assert next(results) == 0
+        with pytest.raises(ValueError, match="job failed"):
+            list(results)
+
+
+def test_staged_reraises_producer_errors() -> None:
+    def items() -> Iterator[int]:
+        yield 1
+        msg = "producer failed"
+        raise RuntimeError(msg)
+
+    stage = staged(items(), maxsize=1)
+    assert next(stage) == 1
+    with pytest.raises(RuntimeError, match="producer failed"):
+        next(stage)
@@ -0,0 +1,95 @@
+import time
+from collections.abc import Callable, Collection, Iterator
+from pathlib import Path
+
+import pytest
+
+from flare_ai_rag.indexer import watcher
+from flare_ai_rag.indexer.watcher import SourceWatcher
+from flare_ai_rag.utils import data_maker
+
+SOURCES = [{"name": "docs", "entry_points": ["."], "include": ["*.md"]}]
+DEBOUNCE = 0.2
+SETTLE_SECONDS = 1.5
+
+
+class FakeIndexer:
+    def __init__(self, data_path: Path) -> None:
+        self.data_path = data_path
+        self.updates: list[set[Path]] = []
+
+    def update(self, changed_files: Collection[Path]) -> None:
+        self.updates.append(set(changed_files))
+        # The indexer reads the changed files again.
+        for file in changed_files:
+            if file.exists():
+                file.read_text()
+
+
+@pytest.fixture
+def indexer(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> FakeIndexer:
+    monkeypatch.setattr(watcher, "read_settings", lambda: SOURCES)
+    monkeypatch.setattr(data_maker, "read_settings", lambda: SOURCES)
+    (tmp_path / "files" / "docs").mkdir(parents=True)
+    (tmp_path / "files" / "docs" / "a.md").write_text("# A\n")
+    return FakeIndexer(tmp_path)
+
+
+@pytest.fixture(params=["inotify", "polling"])
+def start_watcher(
+    request: pytest.FixtureRequest, indexer: FakeIndexer
+) -> Iterator[Callable[[], SourceWatcher]]:
+    use_inotify = request.param == "inotify"
+    if use_inotify:
+        pytest.importorskip("watchdog")
+    source_watcher = SourceWatcher(
+        indexer,  # type: ignore[arg-type]
+        debounce=DEBOUNCE,
+        poll_interval=DEBOUNCE / 2,
+        use_inotify=use_inotify,
+    )
+
+    def start() -> SourceWatcher:
+        source_watcher.start()
+        return source_watcher
+
+    yield start
+    source_watcher.stop(timeout=5)
+
+
+def wait_for_update(indexer: FakeIndexer) -> None:
+    deadline = time.monotonic() + 10
+    while not indexer.updates and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+
+def test_read_triggers_no_update(
+    indexer: FakeIndexer, start_watcher: Callable[[], SourceWatcher]
+) -> None:
+    file = indexer.data_path / "files" / "docs" / "a.md"
+    start_watcher()
+    for _ in range(5):
+        file.read_text()
+    time.sleep(SETTLE_SECONDS)
+    assert indexer.updates == []
+
+
+def test_edit_triggers_one_update(
+    indexer: FakeIndexer, start_watcher: Callable[[], SourceWatcher]
+) -> None:
+    file = indexer.data_path / "files" / "docs" / "a.md"
+    start_watcher()
+    file.write_text("# A\n\nEdited.\n")
+    wait_for_update(indexer)
+    # Reading the file while indexing it must not trigger another update.
+    time.sleep(SETTLE_SECONDS)
+    assert indexer.updates == [{file}]
+
+
+def test_ignores_files_that_are_no_sources(
+    indexer: FakeIndexer, start_watcher: Callable[[], SourceWatcher]
+) -> None:
+    start_watcher()
+    (indexer.data_path / "files" / "docs" / "notes.swp").write_text("x")
+    time.sleep(SETTLE_SECONDS)
+    assert indexer.updates == []
@@ -0,0 +1,46 @@
+import pytest
+
+from flare_ai_rag.utils.splitter import solidity_split
+
+CONTRACT = """\
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.0;
+
+import "./SafePct.sol";
+/**
+ * @title Token
+ * @notice A token contract.
+ */
+contract Token is ERC20 {
+    uint256 public supply;
+
+    function mint(uint256 amount) public {
+        require(amount > 0, "Nothing to mint");
+        require(supply + amount <= cap, "Cap exceeded");
+        supply += amount;
+    }
+
+    function burn(uint256 amount) public {
+        supply -= amount;
+    }
+}
+"""
+BUDGET = 200
+
+
+@pytest.mark.parametrize("budget", [BUDGET, 280])
+def test_solidity_chunks_keep_the_source_tokens(budget: int) -> None:
+    words = set(CONTRACT.split())
+    chunks = solidity_split(CONTRACT, budget)
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert set(chunk.split()) <= words
+
+
+def test_contract_chunks_start_at_the_declaration() -> None:
+    chunks = solidity_split(CONTRACT, BUDGET)
+    natspec = [chunk for chunk in chunks if "@title" in chunk]
+    assert len(natspec) == 1
+    (burn,) = [chunk for chunk in chunks if "function burn" in chunk]
+    assert burn.startswith("contract Token is ERC20 {\n")
+    assert burn.endswith("\n}")